@@ -4,65 +4,219 @@ Professional version with clean UI
 Detection logic remains UNCHANGED
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify
 import cv2
-from ultralytics import YOLO
 import numpy as np
 import base64
+import json
 import os
+import threading
+import time
 import torch
 
+from buffers import FramePool
+from boxes import (centers_outside, extract_boxes, iou_matrix, largest_index, nms,
+                   size_mask, to_pixels, weighted_box_fusion)
+from codec import CODEC
+from frame_cache import DetectionCache
+from inference import STRIDE, FrameDeadline, RectExportCache, rect_imgsz
+from memstats import memory_info
+from motion import MotionGate
+from recording import FrameRecorder
+from registry import ModelRegistry
+from scheduler import FairScheduler, Throttled
+from stream import HUB, BOUNDARY
+from tuning import TUNING_PATH, apply_threads, load_tuning
+
+# RTIOC_STUB_MODELS=1 swaps the detectors for fixed-latency stand-ins (load testing)
+STUB_MODELS = os.environ.get('RTIOC_STUB_MODELS') == '1'
+if STUB_MODELS:
+    from stub_models import StubYOLO as YOLO
+else:
+    from ultralytics import YOLO
+
 app = Flask(__name__)
 
+# Thread counts, PROCESS_SIZE and worker count measured by autotune.py on this machine
+TUNING = load_tuning(os.environ.get('RTIOC_TUNING', TUNING_PATH))
+apply_threads(TUNING)
+if TUNING:
+    print(f"Tuning: {', '.join(f'{k}={v}' for k, v in TUNING.items())}")
+
 DEVICE = 0 if torch.cuda.is_available() else 'cpu'
 print(f"Using device: {'GPU' if DEVICE == 0 else 'CPU'}")
+print(f"JPEG codec: {CODEC.backend}")
 
 # Model paths
 MODEL_PATH_FACE = 'models/yolov8n-face-lindevs.pt'
 MODEL_PATH_ID   = 'models/best.pt'
 MODEL_PATH_ID2  = 'models/best2.pt'   # ← new trained model
+MODEL_PATH_UNIFIED = 'models/unified.pt'   # optional face+ID model (train_unified.py)
+USE_UNIFIED     = True   # one forward pass per frame when the unified model is present
+UNIFIED_CLASSES = {'face': 0, 'id': 1}
 
-if not os.path.exists(MODEL_PATH_FACE):
+# Extra ID models a request can pick with 'id_model' (JSON) or X-RTIOC-Id-Model,
+# e.g. one per tenant. A variant replaces the default ID model(s) for that frame.
+MODEL_VARIANTS = {
+    # 'tenant-a': 'models/tenant_a_id.pt',
+}
+MODEL_CACHE_MODELS = 4      # loaded models kept besides the pinned defaults (LRU)
+MODEL_CACHE_MB     = None   # or a cap on the estimated weight bytes of all loaded models
+
+def model_available(path):
+    return STUB_MODELS or os.path.exists(path)
+
+if not model_available(MODEL_PATH_FACE):
     print(f"❌ ERROR: Face model not found at {MODEL_PATH_FACE}")
     exit(1)
 
-if not os.path.exists(MODEL_PATH_ID):
+if not model_available(MODEL_PATH_ID):
     print(f"❌ ERROR: ID card model not found at {MODEL_PATH_ID}")
     exit(1)
 
-# Load models
-print("Loading models...")
-model_face    = YOLO(MODEL_PATH_FACE)
-model_idcard  = YOLO(MODEL_PATH_ID)
-model_idcard2 = None
-if os.path.exists(MODEL_PATH_ID2):
-    model_idcard2 = YOLO(MODEL_PATH_ID2)
-    print("✅ Models loaded (face + 2x ID card models)!")
+# Models load on first use; see MODEL_VARIANTS / MODEL_CACHE_* below
+print("Using stub models" if STUB_MODELS else "Models load on first use")
+model_registry = ModelRegistry(YOLO, MODEL_CACHE_MODELS,
+                               MODEL_CACHE_MB * 1024 * 1024 if MODEL_CACHE_MB else None)
+# the models every frame needs are pinned: never evicted by request-selected variants
+use_unified = USE_UNIFIED and os.path.exists(MODEL_PATH_UNIFIED)
+model_registry.register('face', MODEL_PATH_FACE, pinned=not use_unified)
+model_registry.register('id', MODEL_PATH_ID, pinned=not use_unified)
+if model_available(MODEL_PATH_ID2):
+    model_registry.register('id2', MODEL_PATH_ID2)
+    print("✅ Models registered (face + 2x ID card models)")
 else:
-    print("✅ Models loaded (face + 1x ID card model)")
+    print("✅ Models registered (face + 1x ID card model)")
+if use_unified:
+    model_registry.register('unified', MODEL_PATH_UNIFIED, pinned=True)
+    print("✅ Unified face+ID model registered — separate models kept as fallback")
+for variant, path in MODEL_VARIANTS.items():
+    if model_available(path):
+        model_registry.register('id:' + variant, path)
+    else:
+        print(f"⚠️  ID model variant {variant!r} not found at {path} — skipped")
 
 # Detection parameters
 FACE_CONFIDENCE = 0.45
 ID_CONFIDENCE   = 0.50   # Balanced — catches distant cards too
 BLUR_STRENGTH   = 15
-PROCESS_SIZE    = 320
+PROCESS_SIZE    = TUNING.get('process_size', 320)
+
+# Rectangular inference — stride-aligned input at the frame's aspect ratio. .pt models
+# already get this from ultralytics; it saves work for static exports and the ID upscale
+INFER_RECT      = True
+INFER_EXPORT    = None   # e.g. 'onnx' or 'openvino': static export cached per shape
+ID_RECT_SIZE    = PROCESS_SIZE   # long side of the ID input in rect mode
+
+# Per-frame latency budget (None = always run every model to completion)
+FRAME_BUDGET_MS = None   # e.g. 150 on overloaded CPU hosts
+ID2_SKIP_AT     = 0.6    # skip the second ID model once this share of the budget is used
+
+# Motion gating — skip or narrow detection on unchanged frames (static cameras)
+MOTION_GATE     = False  # enable for surveillance-style feeds (ingest.py --motion-gate)
+MOTION_MARGIN   = 24     # px added around changed regions before they are re-detected
+
+# Repeated-frame cache — identical frames reuse the detector output
+FRAME_CACHE_MODE    = 'exact'   # 'exact' (same JPEG bytes), 'phash' (near-identical) or None
+if os.environ.get('RTIOC_FRAME_CACHE') == 'off':
+    FRAME_CACHE_MODE = None     # load tests replay looping clips — time inference, not hits
+FRAME_CACHE_ENTRIES = 1024
+FRAME_CACHE_MB      = 32
+
+# JPEG codec
+JPEG_QUALITY    = 60
+DECODE_MAX_SIDE = 640    # larger uploads are DCT-scaled down while decoding
+MCU_SIZE        = 16     # 4:2:0 JPEG block size — patches are aligned to it
+ROI_PATCH_MAX_FRACTION = 0.3   # above this redacted area, re-encode the whole frame
 
 # Upscale factor for distant card detection
 # Frame is enlarged before being sent to model — makes small/far cards bigger
+# (square mode only: rect mode resizes straight to ID_RECT_SIZE, raise that instead)
 ID_UPSCALE      = 2.0    # 2x upscale — increase to 3.0 if still missing far cards
 
+# Dual ID model ensemble (only used when models/best2.pt exists)
+ID_ENSEMBLE      = 'wbf'       # 'wbf' weighted box fusion, 'nms', or 'concat' (no merging)
+ID_MODEL_WEIGHTS = (1.0, 1.0)  # per-model confidence weights (primary, secondary)
+ID_FUSION_IOU    = 0.55
+ID_CASCADE       = True        # run the second model only when the primary needs help
+ID_CASCADE_CONF  = 0.70        # primary boxes below this confidence count as uncertain
+ID_CASCADE_EVERY = 10          # ...and always every N frames, to catch cards only it sees
+
 # Temporal smoothing
 ID_CONFIRM_FRAMES = 4    # frames needed to confirm (higher = less flicker)
 ID_FORGET_FRAMES  = 8    # frames to keep blur after card disappears
 ID_SMOOTH_ALPHA   = 0.6  # box position smoothing 0=very smooth/slow, 1=instant/jumpy
 
-# Smoothing state
-id_tracker = {
-    'boxes': [],        # confirmed box positions (smoothed)
-    'candidates': [],
-    'hit_counts': [],
-    'miss_counts': [],
+# Smoothing state — one tracker per stream (browser session or camera source)
+def new_id_tracker():
+    return {
+        'boxes': [],        # confirmed box positions (smoothed)
+        'candidates': [],
+        'hit_counts': [],
+        'miss_counts': [],
+        'track_ids': [],    # stable id of each confirmed box, for clients
+        'next_track': 1,
+        'since_second': 0,  # frames since the second ID model last ran (cascade)
+    }
+
+
+id_tracker = new_id_tracker()
+
+
+# Everything a stream keeps between frames
+def new_session(tracker=None, pooled=True, motion=None):
+    motion = MOTION_GATE if motion is None else motion
+    return {
+        'tracker': new_id_tracker() if tracker is None else tracker,
+        'pool': FramePool() if pooled else None,   # reused decode/output/upscale/blur arrays
+        'faces': np.zeros((0, 4), dtype=np.int32),    # last detected faces
+        'raw_ids': np.zeros((0, 4), dtype=np.int32),  # last raw ID boxes (before tracking)
+        'motion': MotionGate() if motion else None,
+        'lock': threading.Lock(),   # frames of one session run one at a time
+        'last_seq': 0,              # newest frame number processed (pipelined clients)
+        'size': None,               # [w, h] of the last frame, for heartbeat replies
+        'frame': None,              # last frame (may be pooled — use under 'lock')
+    }
+
+
+default_session = new_session(id_tracker)
+
+rect_exports = RectExportCache(INFER_EXPORT) if INFER_EXPORT else None
+frame_cache = (DetectionCache(FRAME_CACHE_MODE, FRAME_CACHE_ENTRIES, FRAME_CACHE_MB * 1024 * 1024)
+               if FRAME_CACHE_MODE else None)
+
+# Opt-in recording of incoming frames for replay.py (append-only, raw uploads)
+RECORD_PATH = os.environ.get('RTIOC_RECORD')   # e.g. recordings/prod.rtrec
+recorder = FrameRecorder(RECORD_PATH) if RECORD_PATH else None
+
+# Inference scheduling across sessions (scheduler.py). A request picks its class
+# with 'priority' (JSON) or X-RTIOC-Priority.
+INFER_SLOTS      = 1      # frames in the models at once
+SCHED_CLASSES    = {      # name: (rank, weight, max fps per session); lower rank runs first
+    'live': (0, 1.0, 30),     # browser calls and cameras
+    'bulk': (1, 1.0, None),   # batch redaction — gets what live sessions leave
 }
+DEFAULT_PRIORITY = 'live'
+STARVATION_MS    = 1000   # a frame queued this long runs next whatever its class
+scheduler = FairScheduler(INFER_SLOTS, SCHED_CLASSES, STARVATION_MS)
+
+# Per-client state, keyed by the session id the page sends with each frame
+SESSION_TTL = 120        # seconds without frames before a session is dropped
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def get_session(sid):
+    now = time.time()
+    with sessions_lock:
+        for key in [k for k, v in sessions.items() if now - v['seen'] > SESSION_TTL]:
+            del sessions[key]
+            HUB.drop(key)
+        session = sessions.get(sid)
+        if session is None:
+            session = sessions[sid] = new_session()
+        session['seen'] = now
+    return session
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -447,6 +601,8 @@ HTML_TEMPLATE = """
         <div class="fps-info">
             <span>Frames: <span class="fps-val" id="frameCount">0</span></span>
             <span>Latency: <span class="fps-val" id="latencyDisplay">—</span> ms</span>
+            <a class="fps-val" id="streamLink" target="_blank">Share stream</a>
+            <a class="fps-val" id="modeLink"></a>
         </div>
     </div>
     
@@ -470,7 +626,7 @@ HTML_TEMPLATE = """
                 <span class="badge">AI</span>
             </div>
             <div class="video-wrap">
-                <img class="processed-img" id="processedImg" style="display:none;">
+                <canvas class="processed-img" id="processedCanvas" style="display:none;"></canvas>
                 <div class="placeholder" id="aiHolder">
                     <div class="placeholder-icon">🤖</div>
                     <div class="placeholder-text">Awaiting Input</div>
@@ -530,14 +686,53 @@ HTML_TEMPLATE = """
     <div class="dot" id="dot3"></div>
 </div>
 
-<canvas id="captureCanvas"></canvas>
-
+<script src="/worker.js"></script>
 <script>
-    let stream=null,running=false,frameCount=0,totalLatency=0,processing=false;
+    let stream=null,running=false,frameCount=0,totalLatency=0;
+    // Keeps this tab's ID tracker separate and names its /stream/<id>.mjpg feed
+    const sessionId=crypto.randomUUID?crypto.randomUUID():Math.random().toString(36).slice(2);
+    document.getElementById('streamLink').href='/stream/'+sessionId+'.mjpg';
+    // ?redact=client: send a small detection frame, get only boxes back and
+    // blur the full-resolution camera frame here (server cost stays flat)
+    const CLIENT_REDACT=new URLSearchParams(location.search).get('redact')==='client';
+    const DETECT_WIDTH=320;
+    // ?inflight=N: frames uploaded before the first answer comes back
+    const MAX_IN_FLIGHT=Math.max(1,parseInt(new URLSearchParams(location.search).get('inflight'))||2);
+    let seq=0,inFlight=0,lastShown=0;
+    const pending=new Map();   // frame number -> {full: ImageBitmap, t0}
+    // Delta gate: a frame whose downsampled gray image changed less than
+    // ?delta=N levels (mean, 0-255) since the last upload is not sent — a
+    // heartbeat goes instead and the server replays its last boxes. Every
+    // ?refresh=N-th frame is uploaded regardless.
+    const DELTA_THRESHOLD=parseFloat(new URLSearchParams(location.search).get('delta'))||3;
+    const REFRESH_EVERY=parseInt(new URLSearchParams(location.search).get('refresh'))||15;
+    const THUMB_W=32,THUMB_H=24;
+    const thumbCanvas=document.createElement('canvas');
+    thumbCanvas.width=THUMB_W;
+    thumbCanvas.height=THUMB_H;
+    const thumbCtx=thumbCanvas.getContext('2d',{willReadFrequently:true});
+    let lastThumb=null,sinceUpload=0;
+    // Server mode shows the last uploaded frame's redaction: when a heartbeat's
+    // boxes differ from it (an ID card just confirmed or forgotten) the next
+    // frame is uploaded so the new blur is drawn right away
+    let shownOverlays='',forceUpload=false;
+    // Encode, upload and decode off the main thread where OffscreenCanvas exists;
+    // otherwise the same code (loaded from /worker.js below) runs here
+    const worker=(window.Worker&&window.OffscreenCanvas)?new Worker('/worker.js'):null;
+    if(worker) worker.onmessage=e=>onResult(e.data);
+    const modeLink=document.getElementById('modeLink');
+    modeLink.href=CLIENT_REDACT?'?redact=server':'?redact=client';
+    modeLink.textContent=CLIENT_REDACT?'Server blur':'Full-res blur';
     const video=document.getElementById('localVideo');
-    const canvas=document.getElementById('captureCanvas');
-    const ctx=canvas.getContext('2d');
-    const outImg=document.getElementById('processedImg');
+    const outImg=document.getElementById('processedCanvas');
+    const outCtx=outImg.getContext('2d');
+    const CANVAS_FILTER='filter' in outCtx;
+    // Overlay kind -> [box color, label]; same colors as the server's draw_box
+    const OVERLAY_STYLE={
+        speaker:['rgb(136,255,0)','Speaker'],
+        face:['rgb(255,50,50)','Face [blurred]'],
+        id:['rgb(0,100,255)','ID Card [blurred]']
+    };
 
     function setStatus(cls,text){
         document.getElementById('statusDot').className='status-dot '+cls;
@@ -558,7 +753,8 @@ HTML_TEMPLATE = """
 
     async function startCamera(){
         try{
-            stream=await navigator.mediaDevices.getUserMedia({video:{width:320,height:240},audio:false});
+            const size=CLIENT_REDACT?{width:{ideal:1280},height:{ideal:720}}:{width:320,height:240};
+            stream=await navigator.mediaDevices.getUserMedia({video:size,audio:false});
             video.srcObject=stream;
             video.style.display='block';
             document.getElementById('rawHolder').style.display='none';
@@ -566,7 +762,7 @@ HTML_TEMPLATE = """
             document.getElementById('stopBtn').disabled=false;
             setStatus('live','System Active');
             running=true;
-            loop();
+            scheduleFrames();
         }catch(e){
             setStatus('','Camera Error');
         }
@@ -574,7 +770,8 @@ HTML_TEMPLATE = """
 
     function stopCamera(){
         running=false;
-        processing=false;
+        for(const p of pending.values()) p.full.close();
+        pending.clear();
         if(stream){
             stream.getTracks().forEach(t=>t.stop());
             stream=null;
@@ -588,52 +785,256 @@ HTML_TEMPLATE = """
         setStatus('','System Idle');
     }
 
-    async function loop(){
-        while(running){
-            if(processing||video.readyState<2){
-                await new Promise(r=>setTimeout(r,30));
-                continue;
+    function drawOverlay(o,sx,sy){
+        const [color,name]=OVERLAY_STYLE[o.kind];
+        const label=o.track!=null?name.replace(' [',' #'+o.track+' ['):name;
+        const x1=o.box[0]*sx,y1=o.box[1]*sy,x2=o.box[2]*sx,y2=o.box[3]*sy;
+        outCtx.lineWidth=2;
+        outCtx.strokeStyle=color;
+        outCtx.strokeRect(x1,y1,x2-x1,y2-y1);
+        outCtx.font='bold 12px sans-serif';
+        const tw=outCtx.measureText(label).width,th=12;
+        const ly=Math.max(y1-4,th+8);
+        outCtx.fillStyle=color;
+        outCtx.fillRect(x1,ly-th-6,tw+8,th+8);
+        outCtx.fillStyle='#000';
+        outCtx.fillText(label,x1+4,ly-2);
+    }
+
+    // Server sends the full frame, MCU-aligned patches, or nothing when
+    // no redaction happened — then our own copy of the sent frame is shown
+    function render(full,r){
+        const data=r.data,base=r.base||full;
+        outImg.width=base.width;
+        outImg.height=base.height;
+        outCtx.drawImage(base,0,0);
+        const sx=base.width/data.size[0],sy=base.height/data.size[1];
+        for(const p of r.patches) outCtx.drawImage(p.bitmap,p.x*sx,p.y*sy,p.w*sx,p.h*sy);
+        for(const o of data.overlays) drawOverlay(o,sx,sy);
+    }
+
+    // Blur one box of src (already drawn on outCtx) in place; browsers
+    // without canvas filters get a coarse pixelation instead
+    function redactRegion(src,x,y,w,h){
+        if(w<1||h<1) return;
+        if(CANVAS_FILTER){
+            const r=Math.max(6,Math.round(Math.min(w,h)/4));
+            outCtx.save();
+            outCtx.beginPath();
+            outCtx.rect(x,y,w,h);
+            outCtx.clip();
+            outCtx.filter='blur('+r+'px)';
+            outCtx.drawImage(src,x-r,y-r,w+2*r,h+2*r,x-r,y-r,w+2*r,h+2*r);
+            outCtx.restore();
+        }else{
+            const cell=Math.max(w,h)/8;   // ~8 blocks across the long side
+            const tw=Math.max(1,Math.round(w/cell)),th=Math.max(1,Math.round(h/cell));
+            const tiny=document.createElement('canvas');
+            tiny.width=tw;tiny.height=th;
+            tiny.getContext('2d').drawImage(src,x,y,w,h,0,0,tw,th);
+            outCtx.imageSmoothingEnabled=false;
+            outCtx.drawImage(tiny,0,0,tw,th,x,y,w,h);
+            outCtx.imageSmoothingEnabled=true;
+        }
+    }
+
+    // Client mode: boxes come back for the small frame; scale them onto
+    // the full-resolution copy of that same frame and redact it here
+    function renderLocal(full,data){
+        outImg.width=full.width;
+        outImg.height=full.height;
+        outCtx.drawImage(full,0,0);
+        const sx=full.width/data.size[0],sy=full.height/data.size[1];
+        for(const o of data.overlays){
+            if(!o.blurred) continue;
+            const x1=Math.floor(o.box[0]*sx),y1=Math.floor(o.box[1]*sy);
+            redactRegion(full,x1,y1,Math.ceil(o.box[2]*sx)-x1,Math.ceil(o.box[3]*sy)-y1);
+        }
+        for(const o of data.overlays) drawOverlay(o,sx,sy);
+    }
+
+    function detectSize(){
+        if(!CLIENT_REDACT) return [320,240];
+        return [DETECT_WIDTH,Math.round(DETECT_WIDTH*video.videoHeight/video.videoWidth)];
+    }
+
+    function thumbnail(src){
+        thumbCtx.drawImage(src,0,0,THUMB_W,THUMB_H);
+        const px=thumbCtx.getImageData(0,0,THUMB_W,THUMB_H).data;
+        const gray=new Uint8Array(THUMB_W*THUMB_H);
+        for(let i=0;i<gray.length;i++) gray[i]=(px[4*i]*77+px[4*i+1]*150+px[4*i+2]*29)>>8;
+        return gray;
+    }
+
+    function sceneChanged(thumb){
+        if(!lastThumb||forceUpload||sinceUpload>=REFRESH_EVERY) return true;
+        let sum=0;
+        for(let i=0;i<thumb.length;i++) sum+=Math.abs(thumb[i]-lastThumb[i]);
+        return sum/thumb.length>=DELTA_THRESHOLD;
+    }
+
+    // Runs once per camera frame; skipped while MAX_IN_FLIGHT frames are out
+    async function captureFrame(){
+        if(!running||inFlight>=MAX_IN_FLIGHT||video.readyState<2) return;
+        const id=++seq;
+        inFlight++;
+        try{
+            const [dw,dh]=detectSize();
+            const full=await createImageBitmap(video);
+            const thumb=thumbnail(full);
+            const upload=sceneChanged(thumb);
+            if(upload){
+                lastThumb=thumb;
+                sinceUpload=0;
+                forceUpload=false;
+            }else{
+                sinceUpload++;
+            }
+            const small=upload?await createImageBitmap(full,{resizeWidth:dw,resizeHeight:dh,resizeQuality:'medium'}):null;
+            pending.set(id,{full,t0:performance.now()});
+            const meta={id,session:sessionId,boxesOnly:CLIENT_REDACT,quality:0.5,heartbeat:!upload};
+            if(worker) worker.postMessage({bitmap:small,meta},small?[small]:[]);
+            else sendFrame(small,meta,()=>document.createElement('canvas'))
+                .then(onResult,err=>onResult({id,error:String(err)}));
+        }catch(e){
+            inFlight--;
+        }
+    }
+
+    function scheduleFrames(){
+        if(!running) return;
+        const next=()=>{captureFrame();scheduleFrames();};
+        if(video.requestVideoFrameCallback) video.requestVideoFrameCallback(next);
+        else requestAnimationFrame(next);
+    }
+
+    function closeResult(r){
+        if(r.base) r.base.close();
+        for(const p of r.patches||[]) p.bitmap.close();
+    }
+
+    function onResult(r){
+        inFlight--;
+        const p=pending.get(r.id);
+        pending.delete(r.id);
+        // Late answers (an older frame than the one on screen) are dropped
+        if(!running||!p||r.error||r.data.status!=='ok'||r.id<lastShown){
+            if(p) p.full.close();
+            closeResult(r);
+            return;
+        }
+        lastShown=r.id;
+        const data=r.data,ms=Math.round(performance.now()-p.t0);
+        // A heartbeat in server mode has no image: the redacted frame on screen stays
+        if(CLIENT_REDACT) renderLocal(p.full,data);
+        else{
+            const boxes=JSON.stringify(data.overlays||[]);
+            if(!data.heartbeat){
+                render(p.full,r);
+                shownOverlays=boxes;
+            }else if(boxes!==shownOverlays){
+                forceUpload=true;
             }
-            canvas.width=320;
-            canvas.height=240;
-            ctx.drawImage(video,0,0,320,240);
-            const frameData=canvas.toDataURL('image/jpeg',0.5);
-            const t0=performance.now();
-            processing=true;
-            try{
-                const res=await fetch('/process_frame',{
-                    method:'POST',
-                    headers:{'Content-Type':'application/json'},
-                    body:JSON.stringify({frame:frameData})
-                });
-                const data=await res.json();
-                const ms=Math.round(performance.now()-t0);
-                if(data.status==='ok'){
-                    outImg.src='data:image/jpeg;base64,'+data.frame;
-                    outImg.style.display='block';
-                    document.getElementById('aiHolder').style.display='none';
-                    frameCount++;
-                    totalLatency+=ms;
-                    document.getElementById('frameCount').textContent=frameCount;
-                    document.getElementById('latencyDisplay').textContent=ms;
-                    document.getElementById('statFaces').textContent=data.faces||0;
-                    document.getElementById('statIds').textContent=data.ids||0;
-                    document.getElementById('statFrames').textContent=frameCount;
-                    document.getElementById('statAvgLat').innerHTML=Math.round(totalLatency/frameCount)+'<span class="stat-unit">ms</span>';
-                }
-            }catch(e){}
-            processing=false;
         }
+        p.full.close();
+        closeResult(r);
+        outImg.style.display='block';
+        document.getElementById('aiHolder').style.display='none';
+        frameCount++;
+        totalLatency+=ms;
+        document.getElementById('frameCount').textContent=frameCount;
+        document.getElementById('latencyDisplay').textContent=ms;
+        document.getElementById('statFaces').textContent=data.faces||0;
+        document.getElementById('statIds').textContent=data.ids||0;
+        document.getElementById('statFrames').textContent=frameCount;
+        document.getElementById('statAvgLat').innerHTML=Math.round(totalLatency/frameCount)+'<span class="stat-unit">ms</span>';
     }
 </script>
 </body>
 </html>
 """
 
+# Frame pipeline of the page: runs as a Web Worker (OffscreenCanvas) and,
+# in browsers without one, as a plain script on the page
+WORKER_JS = """
+function canvasToBlob(canvas,quality){
+    if(canvas.convertToBlob) return canvas.convertToBlob({type:'image/jpeg',quality});
+    return new Promise(resolve=>canvas.toBlob(resolve,'image/jpeg',quality));
+}
+
+function base64ToBlob(b64){
+    const bin=atob(b64),bytes=new Uint8Array(bin.length);
+    for(let i=0;i<bin.length;i++) bytes[i]=bin.charCodeAt(i);
+    return new Blob([bytes],{type:'image/jpeg'});
+}
+
+// Encode the detection frame, POST it as raw JPEG and decode whatever
+// images come back into ImageBitmaps the page can draw straight away
+async function sendFrame(bitmap,meta,makeCanvas){
+    if(meta.heartbeat){
+        const res=await fetch('/process_frame',{
+            method:'POST',
+            headers:{'X-RTIOC-Heartbeat':'1','X-RTIOC-Session':meta.session,
+                     'X-RTIOC-Seq':String(meta.id),'X-RTIOC-Boxes-Only':meta.boxesOnly?'1':'0'}
+        });
+        return {id:meta.id,data:await res.json(),base:null,patches:[]};
+    }
+    const canvas=makeCanvas();
+    canvas.width=bitmap.width;
+    canvas.height=bitmap.height;
+    canvas.getContext('2d').drawImage(bitmap,0,0);
+    bitmap.close();
+    const blob=await canvasToBlob(canvas,meta.quality);
+    const res=await fetch('/process_frame',{
+        method:'POST',
+        headers:{'Content-Type':'image/jpeg','X-RTIOC-Session':meta.session,
+                 'X-RTIOC-Seq':String(meta.id),'X-RTIOC-Boxes-Only':meta.boxesOnly?'1':'0'},
+        body:blob
+    });
+    const data=await res.json();
+    const out={id:meta.id,data,base:null,patches:[]};
+    if(data.frame) out.base=await createImageBitmap(base64ToBlob(data.frame));
+    for(const p of data.patches||[]){
+        out.patches.push({x:p.x,y:p.y,w:p.w,h:p.h,bitmap:await createImageBitmap(base64ToBlob(p.data))});
+    }
+    delete data.frame;
+    delete data.patches;
+    return out;
+}
+
+if(typeof WorkerGlobalScope!=='undefined'&&self instanceof WorkerGlobalScope){
+    self.onmessage=async e=>{
+        const {bitmap,meta}=e.data;
+        try{
+            const out=await sendFrame(bitmap,meta,()=>new OffscreenCanvas(1,1));
+            const transfer=[out.base,...out.patches.map(p=>p.bitmap)].filter(Boolean);
+            self.postMessage(out,transfer);
+        }catch(err){
+            self.postMessage({id:meta.id,error:String(err)});
+        }
+    };
+}
+"""
+
 # ═══════════════════════════════════════════════════════════════
-# DETECTION LOGIC - COMPLETELY UNCHANGED (WORKING PERFECTLY!)
+# DETECTION LOGIC
 # ═══════════════════════════════════════════════════════════════
 
+GREEN = (0, 255, 136)
+RED   = (50, 50, 255)
+BLUE  = (255, 100, 0)
+
+# Overlay kind -> (box color, label) and (blur kernel, sigma)
+OVERLAY_STYLE = {
+    'speaker': (GREEN, "Speaker"),
+    'face':    (RED, "Face [blurred]"),
+    'id':      (BLUE, "ID Card [blurred]"),
+}
+BLUR_PARAMS = {
+    'face': ((BLUR_STRENGTH, BLUR_STRENGTH), 15),
+    'id':   ((31, 31), 30),
+}
+
 def draw_box(img, x1, y1, x2, y2, color, label):
     cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
     font = cv2.FONT_HERSHEY_SIMPLEX
@@ -644,22 +1045,8 @@ def draw_box(img, x1, y1, x2, y2, color, label):
     cv2.putText(img, label, (x1 + 4, ly - 2), font, fs, (0, 0, 0), ft, cv2.LINE_AA)
 
 
-def box_iou(a, b):
-    """Intersection over Union — measures how much two boxes overlap"""
-    ax1, ay1, ax2, ay2 = a
-    bx1, by1, bx2, by2 = b
-    ix1, iy1 = max(ax1, bx1), max(ay1, by1)
-    ix2, iy2 = min(ax2, bx2), min(ay2, by2)
-    if ix2 <= ix1 or iy2 <= iy1:
-        return 0.0
-    inter = (ix2 - ix1) * (iy2 - iy1)
-    area_a = (ax2 - ax1) * (ay2 - ay1)
-    area_b = (bx2 - bx1) * (by2 - by1)
-    return inter / (area_a + area_b - inter)
-
-
-def update_id_tracker(raw_boxes):
-    t = id_tracker
+def update_id_tracker(raw_boxes, tracker=None):
+    t = id_tracker if tracker is None else tracker
     IOU_THRESH = 0.3
 
     def smooth_box(old, new):
@@ -672,131 +1059,396 @@ def update_id_tracker(raw_boxes):
             int(old[3] * (1-a) + new[3] * a),
         )
 
+    raw_arr = np.asarray(raw_boxes, dtype=np.int32).reshape(-1, 4)
+    raw_boxes = [tuple(int(v) for v in b) for b in raw_arr]
+
+    # Each candidate takes the first still-unmatched raw box it overlaps
     matched_candidates = set()
-    matched_raw = set()
-    for i, cand in enumerate(t['candidates']):
-        for j, raw in enumerate(raw_boxes):
-            if j in matched_raw:
-                continue
-            if box_iou(cand, raw) > IOU_THRESH:
-                t['candidates'][i] = smooth_box(cand, raw)
+    matched_raw = np.zeros(len(raw_boxes), dtype=bool)
+    if t['candidates'] and raw_boxes:
+        overlaps = iou_matrix(t['candidates'], raw_arr) > IOU_THRESH
+        for i, cand in enumerate(t['candidates']):
+            free = np.flatnonzero(overlaps[i] & ~matched_raw)
+            if free.size:
+                j = free[0]
+                t['candidates'][i] = smooth_box(cand, raw_boxes[j])
                 t['hit_counts'][i] += 1
                 matched_candidates.add(i)
-                matched_raw.add(j)
-                break
+                matched_raw[j] = True
 
     for i in range(len(t['candidates'])):
         if i not in matched_candidates:
             t['hit_counts'][i] = 0
 
     for j, raw in enumerate(raw_boxes):
-        if j not in matched_raw:
+        if not matched_raw[j]:
             t['candidates'].append(raw)
             t['hit_counts'].append(1)
 
     new_candidates, new_hits = [], []
     for box, hits in zip(t['candidates'], t['hit_counts']):
         if hits >= ID_CONFIRM_FRAMES:
-            if not any(box_iou(box, cb) > IOU_THRESH for cb in t['boxes']):
+            if not t['boxes'] or not (iou_matrix(box, t['boxes']) > IOU_THRESH).any():
                 t['boxes'].append(box)
                 t['miss_counts'].append(0)
+                t['track_ids'].append(t['next_track'])
+                t['next_track'] += 1
         elif hits > 0:
             new_candidates.append(box)
             new_hits.append(hits)
     t['candidates'] = new_candidates
     t['hit_counts'] = new_hits
 
+    # Each raw box refreshes the first confirmed box it overlaps
     matched_confirmed = set()
-    for j, raw in enumerate(raw_boxes):
-        for i, conf in enumerate(t['boxes']):
-            if box_iou(raw, conf) > IOU_THRESH:
-                t['boxes'][i] = smooth_box(conf, raw)  # smooth position update
-                t['miss_counts'][i] = 0
-                matched_confirmed.add(i)
-                break
+    for raw in raw_boxes:
+        if not t['boxes']:
+            break
+        hits = np.flatnonzero(iou_matrix(raw, t['boxes'])[0] > IOU_THRESH)
+        if hits.size:
+            i = int(hits[0])
+            t['boxes'][i] = smooth_box(t['boxes'][i], raw)  # smooth position update
+            t['miss_counts'][i] = 0
+            matched_confirmed.add(i)
 
     for i in range(len(t['boxes'])):
         if i not in matched_confirmed:
             t['miss_counts'][i] += 1
 
     # Remove confirmed boxes that have been missing too long
-    surviving = [(b, m) for b, m in zip(t['boxes'], t['miss_counts'])
+    surviving = [(b, m, k) for b, m, k in zip(t['boxes'], t['miss_counts'], t['track_ids'])
                  if m <= ID_FORGET_FRAMES]
     t['boxes'] = [x[0] for x in surviving]
     t['miss_counts'] = [x[1] for x in surviving]
+    t['track_ids'] = [x[2] for x in surviving]
 
     return t['boxes']
 
 
-def run_detection(frame):
-    output = frame.copy()
-    face_count = 0
+def apply_redactions(frame, overlays, annotate=True, pool=None, name='output'):
+    """
+    Blur redacted overlays (and draw the boxes if annotate) on a copy of
+    frame. With a pool the copy and the blur scratch are reused arrays.
+    """
+    if not any(o['blurred'] for o in overlays) and not (annotate and overlays):
+        return frame
+    if pool is None:
+        output = frame.copy()
+    else:
+        output = pool.get(name, frame.shape)
+        np.copyto(output, frame)
+    for o in overlays:
+        if not o['blurred']:
+            continue
+        x1, y1, x2, y2 = o['box']
+        roi = output[y1:y2, x1:x2]
+        if roi.size > 0:
+            ksize, sigma = BLUR_PARAMS[o['kind']]
+            if pool is None:
+                output[y1:y2, x1:x2] = cv2.GaussianBlur(roi, ksize, sigma)
+            else:
+                scratch = pool.scratch('blur', frame.shape, *roi.shape[:2])
+                cv2.GaussianBlur(roi, ksize, sigma, dst=scratch)
+                np.copyto(roi, scratch)
+    if annotate:
+        for o in overlays:
+            color, label = OVERLAY_STYLE[o['kind']]
+            draw_box(output, *o['box'], color, label)
+    return output
+
+
+def overlay(kind, box, track=None):
+    x1, y1, x2, y2 = box
+    return {'kind': kind, 'box': [int(x1), int(y1), int(x2), int(y2)],
+            'blurred': kind != 'speaker', 'track': track}
 
-    GREEN = (0, 255, 136)
-    RED   = (50, 50, 255)
-    BLUE  = (255, 100, 0)
 
-    # ── Face detection (unchanged) ───────────────────────────────
-    results_face = model_face.predict(
-        source=frame, conf=FACE_CONFIDENCE,
-        verbose=False, imgsz=PROCESS_SIZE, device=DEVICE)
+def cascade_needed(boxes, scores, t):
+    """
+    The second ID model runs when a primary box is uncertain, when a card
+    the tracker is following was not found by the primary, or every
+    ID_CASCADE_EVERY frames. Only reads the tracker: the caller resets
+    t['since_second'] once the second model has actually run.
+    """
+    needed = t['since_second'] >= ID_CASCADE_EVERY
+    if not needed and len(scores):
+        needed = bool(scores.min() < ID_CASCADE_CONF)
+    tracked = t['boxes'] + t['candidates']
+    if not needed and tracked:
+        ious = iou_matrix(tracked, boxes)
+        needed = not len(boxes) or bool((ious.max(axis=1) <= 0.3).any())
+    return needed
 
-    face_boxes = []
-    for r in results_face:
-        for box in r.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            face_boxes.append((x1, y1, x2, y2))
 
-    largest = None
-    if face_boxes:
-        largest = max(face_boxes, key=lambda b: (b[2]-b[0]) * (b[3]-b[1]))
+def fuse_id_boxes(per_model):
+    """Merge (boxes, scores) from the ID models into one (N, 4) int array"""
+    if len(per_model) == 1 or ID_ENSEMBLE == 'concat':
+        return np.concatenate([b for b, _ in per_model])
+    elif ID_ENSEMBLE == 'nms':
+        boxes = np.concatenate([b for b, _ in per_model])
+        scores = np.concatenate([s * w for (_, s), w in zip(per_model, ID_MODEL_WEIGHTS)])
+        boxes = boxes[nms(boxes, scores, ID_FUSION_IOU)]
+    else:
+        boxes, _ = weighted_box_fusion([b for b, _ in per_model], [s for _, s in per_model],
+                                       ID_MODEL_WEIGHTS[:len(per_model)], ID_FUSION_IOU)
+    return np.round(boxes).astype(np.int32)
 
-    for (x1, y1, x2, y2) in face_boxes:
-        face_count += 1
-        if (x1, y1, x2, y2) == largest:
-            draw_box(output, x1, y1, x2, y2, GREEN, "Speaker")
-        else:
-            roi = output[y1:y2, x1:x2]
-            if roi.size > 0:
-                output[y1:y2, x1:x2] = cv2.GaussianBlur(roi, (BLUR_STRENGTH, BLUR_STRENGTH), 15)
-            draw_box(output, x1, y1, x2, y2, RED, "Face [blurred]")
 
-    # ── ID card detection with upscaling + dual model + temporal smoothing ──
-    h, w = frame.shape[:2]
-    upscaled = cv2.resize(frame, (int(w * ID_UPSCALE), int(h * ID_UPSCALE)),
-                          interpolation=cv2.INTER_CUBIC)
-
-    raw_id_boxes = []
-
-    def collect_boxes(model):
-        results = model.predict(
-            source=upscaled, conf=ID_CONFIDENCE,
-            verbose=False, imgsz=PROCESS_SIZE, device=DEVICE)
-        for r in results:
-            for box in r.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                x1 = int(x1 / ID_UPSCALE); y1 = int(y1 / ID_UPSCALE)
-                x2 = int(x2 / ID_UPSCALE); y2 = int(y2 / ID_UPSCALE)
-                bw, bh = x2 - x1, y2 - y1
-                if bw < 30 or bh < 20:
-                    continue
-                raw_id_boxes.append((x1, y1, x2, y2))
+def model_set(id_model=None):
+    """
+    Registry names of the models a frame runs: the defaults, or with id_model
+    the registered ID variant in place of both default ID models (and of the
+    unified model, whose ID head is the default one).
+    """
+    if id_model is None:
+        return {'id': 'id', 'id2': 'id2' if 'id2' in model_registry else None,
+                'unified': 'unified' if 'unified' in model_registry else None}
+    name = 'id:' + id_model
+    if name not in model_registry:
+        raise ValueError(f"unknown ID model {id_model!r}")
+    return {'id': name, 'id2': None, 'unified': None}
+
+
+def predict(name, source, conf, size):
+    """Registry model's predict at imgsz=size, or at an explicit stride-aligned rect in INFER_RECT mode"""
+    if not INFER_RECT:
+        return model_registry.get(name).predict(source=source, conf=conf, verbose=False,
+                                                imgsz=size, device=DEVICE)
+    imgsz = rect_imgsz(source.shape, size)
+    if rect_exports is not None:
+        model = rect_exports.get(model_registry.path(name), imgsz)
+    else:
+        model = model_registry.get(name)
+    return model.predict(source=source, conf=conf, verbose=False,
+                         imgsz=imgsz, device=DEVICE)
+
+
+def crop_size(size, scale):
+    """Inference long side for a crop, so it keeps the full frame's pixel scale"""
+    return size if scale == 1.0 else max(2 * STRIDE, round(size * scale))
+
+
+def detect_faces(frame, scale=1.0):
+    """Face boxes as an (N, 4) int array"""
+    results_face = predict('face', frame, FACE_CONFIDENCE, crop_size(PROCESS_SIZE, scale))
+    face_xyxy, _, _ = extract_boxes(results_face)
+    return to_pixels(face_xyxy)
+
+
+def detect_ids(frame, session, deadline=None, skipped=None, scale=1.0, second=True,
+               models=None):
+    """
+    Raw ID card boxes of this frame from one or both ID models, fused.
+    The second model is left out (and listed in skipped) once the deadline's
+    budget is ID2_SKIP_AT used up, and always when second=False.
+    scale is the frame's size relative to a full frame (for crops).
+    models is a model_set() (default: the default models).
+    """
+    models = model_set() if models is None else models
+    pool = session['pool'] if scale == 1.0 else None
+    if INFER_RECT:
+        # The letterbox resizes straight to the rect shape — an upscaled copy
+        # would only be squashed back down
+        id_source, id_scale, id_size = frame, 1.0, crop_size(ID_RECT_SIZE, scale)
+    else:
+        h, w = frame.shape[:2]
+        up_w, up_h = int(w * ID_UPSCALE), int(h * ID_UPSCALE)
+        dst = pool.get('upscale', (up_h, up_w, 3)) if pool is not None else None
+        id_source = cv2.resize(frame, (up_w, up_h), dst=dst, interpolation=cv2.INTER_CUBIC)
+        id_scale, id_size = ID_UPSCALE, crop_size(PROCESS_SIZE, scale)
+
+    def collect_boxes(name):
+        results = predict(name, id_source, ID_CONFIDENCE, id_size)
+        xyxy, conf, _ = extract_boxes(results)
+        boxes = to_pixels(xyxy, id_scale)
+        keep = size_mask(boxes, 30, 20)
+        return boxes[keep], conf[keep]
 
     # Run primary model
-    collect_boxes(model_idcard)
+    per_model = [collect_boxes(models['id'])]
 
-    # Run second model if loaded
-    if model_idcard2 is not None:
-        collect_boxes(model_idcard2)
+    # Run second model if loaded (in cascade mode only when the primary needs help).
+    # The budget is checked first: a frame over it never counts as the
+    # cascade's periodic run, so the next frame with time left still gets it
+    t = session['tracker']
+    if second and models['id2'] is not None:
+        t['since_second'] += 1
+        if deadline is not None and deadline.used() >= ID2_SKIP_AT:
+            if skipped is not None:
+                skipped.append('id2')
+        elif not ID_CASCADE or cascade_needed(*per_model[0], t):
+            per_model.append(collect_boxes(models['id2']))
+            t['since_second'] = 0
+
+    return fuse_id_boxes(per_model)
+
+
+def detect_unified(frame, scale=1.0):
+    """Faces and raw ID boxes from the single face+ID model in one forward pass"""
+    size = crop_size(max(PROCESS_SIZE, ID_RECT_SIZE if INFER_RECT else PROCESS_SIZE), scale)
+    results = predict('unified', frame, min(FACE_CONFIDENCE, ID_CONFIDENCE), size)
+    xyxy, conf, cls = extract_boxes(results)
+    boxes = to_pixels(xyxy)
+    faces = (cls == UNIFIED_CLASSES['face']) & (conf >= FACE_CONFIDENCE)
+    ids = ((cls == UNIFIED_CLASSES['id']) & (conf >= ID_CONFIDENCE)
+           & size_mask(boxes, 30, 20))
+    return boxes[faces], boxes[ids]
 
-    confirmed_boxes = update_id_tracker(raw_id_boxes)
-    for (x1, y1, x2, y2) in confirmed_boxes:
-        roi = output[y1:y2, x1:x2]
-        if roi.size > 0:
-            output[y1:y2, x1:x2] = cv2.GaussianBlur(roi, (31, 31), 30)
-        draw_box(output, x1, y1, x2, y2, BLUE, "ID Card [blurred]")
 
-    return output, face_count, len(confirmed_boxes)
+def detect_regions(frame, regions, session, models):
+    """
+    Re-detect only the changed regions (as crops). Boxes centred outside
+    them are carried over from the previous frame. Only the primary ID
+    model runs here; the second one gets its turn on the periodic full frame.
+    """
+    h, w = frame.shape[:2]
+    m = MOTION_MARGIN
+    regions = [(max(0, x1 - m), max(0, y1 - m), min(w, x2 + m), min(h, y2 + m))
+               for x1, y1, x2, y2 in regions]
+    faces = [session['faces'][centers_outside(session['faces'], regions)]]
+    ids = [session['raw_ids'][centers_outside(session['raw_ids'], regions)]]
+    for x1, y1, x2, y2 in regions:
+        crop = np.ascontiguousarray(frame[y1:y2, x1:x2])
+        scale = max(x2 - x1, y2 - y1) / max(h, w)
+        if models['unified'] is not None:
+            crop_faces, crop_ids = detect_unified(crop, scale)
+        else:
+            crop_faces = detect_faces(crop, scale)
+            crop_ids = detect_ids(crop, session, scale=scale, second=False, models=models)
+        offset = np.array([x1, y1, x1, y1], dtype=np.int32)
+        faces.append(crop_faces + offset)
+        ids.append(crop_ids + offset)
+    faces = np.concatenate(faces)
+    # a face straddling a region edge can be both carried over and re-found
+    areas = (faces[:, 2] - faces[:, 0]) * (faces[:, 3] - faces[:, 1])
+    return faces[np.sort(nms(faces, areas, 0.5))], np.concatenate(ids)
+
+
+def run_detection(frame, annotate=True, session=None, deadline=None, jpeg=None, redact=True,
+                  id_model=None):
+    """
+    Returns (output, face_count, id_count, overlays, skipped).
+    With annotate=False boxes are only returned as overlays, not drawn.
+    session is the stream's state from new_session() (default: default_session);
+    output may be one of its pooled arrays, valid until its next frame.
+    deadline (a FrameDeadline) bounds the frame's latency: stages that would
+    start after it are skipped and listed in skipped, and their boxes come
+    from the previous frame / the ID tracker instead.
+    jpeg (the frame's encoded bytes, if any) keys the repeated-frame cache.
+    redact=False skips the blur (output is frame) for clients that redact
+    on their side from the overlays.
+    id_model picks a MODEL_VARIANTS ID model for this frame (ValueError if
+    it isn't registered).
+    """
+    session = default_session if session is None else session
+    models = model_set(id_model)
+    skipped = []
+    id_stages = ['id', 'id2'] if models['id2'] is not None else ['id']
+    # cached boxes came from the default models — variants bypass the cache
+    cache = frame_cache if id_model is None else None
+
+    raw_id_boxes = None
+    if deadline is not None and deadline.missed():
+        face_boxes = session['faces']
+        skipped += ['unified'] if models['unified'] is not None else ['face'] + id_stages
+    else:
+        cached = cache.lookup(frame, jpeg) if cache is not None else None
+        gate = session['motion']
+        if cached is not None:
+            decision, regions = 'cached', None
+        elif gate is not None:
+            decision, regions = gate.analyse(frame)
+        else:
+            decision, regions = 'full', None
+
+        if decision == 'cached':
+            face_boxes, raw_id_boxes = cached
+        elif decision == 'none':
+            # Nothing moved — same boxes as last frame, tracker keeps counting hits
+            face_boxes, raw_id_boxes = session['faces'], session['raw_ids']
+        elif decision == 'regions':
+            face_boxes, raw_id_boxes = detect_regions(frame, regions, session, models)
+        elif models['unified'] is not None:
+            face_boxes, raw_id_boxes = detect_unified(frame)
+        else:
+            face_boxes = detect_faces(frame)
+            if deadline is not None and deadline.missed():
+                skipped += id_stages
+            else:
+                raw_id_boxes = detect_ids(frame, session, deadline, skipped, models=models)
+        # Only complete full-frame results are worth remembering
+        if cache is not None and decision == 'full' and not skipped:
+            cache.store(frame, face_boxes, raw_id_boxes, jpeg)
+    session['faces'] = face_boxes
+    if raw_id_boxes is not None:
+        session['raw_ids'] = raw_id_boxes
+    session['size'] = [frame.shape[1], frame.shape[0]]
+    session['frame'] = frame   # redrawn for stream viewers on heartbeats
+
+    # ID cards go through temporal smoothing before they are blurred;
+    # a skipped ID stage keeps the tracker's current boxes as they are
+    if raw_id_boxes is None:
+        confirmed_boxes = list(session['tracker']['boxes'])
+    else:
+        confirmed_boxes = update_id_tracker(raw_id_boxes, session['tracker'])
+    overlays = session_overlays(face_boxes, confirmed_boxes, session['tracker'])
+
+    output = apply_redactions(frame, overlays, annotate, session['pool']) if redact else frame
+    return output, len(face_boxes), len(confirmed_boxes), overlays, skipped
+
+
+def session_overlays(face_boxes, confirmed_boxes, tracker):
+    speaker = largest_index(face_boxes)
+    overlays = [overlay('speaker' if i == speaker else 'face', b)
+                for i, b in enumerate(face_boxes)]
+    overlays += [overlay('id', b, track)
+                 for b, track in zip(confirmed_boxes, tracker['track_ids'])]
+    return overlays
+
+
+def run_heartbeat(session):
+    """
+    A client's "scene unchanged" tick instead of a frame: the last frame's
+    detections count once more, exactly as if that frame had been uploaded
+    again, so ID tracker hits and misses (ID_FORGET_FRAMES) keep advancing.
+    Returns (face_count, id_count, overlays), or None before the first frame.
+    """
+    if session['size'] is None:
+        return None
+    face_boxes = session['faces']
+    confirmed_boxes = update_id_tracker(session['raw_ids'], session['tracker'])
+    overlays = session_overlays(face_boxes, confirmed_boxes, session['tracker'])
+    return len(face_boxes), len(confirmed_boxes), overlays
+
+
+def roi_patches(output, overlays):
+    """
+    Re-encode only the MCU-aligned regions that were blurred. Returns None
+    when the redacted area is large enough that a full re-encode is cheaper.
+    """
+    h, w = output.shape[:2]
+    rects = []
+    area = 0
+    for o in overlays:
+        if not o['blurred']:
+            continue
+        x1, y1, x2, y2 = o['box']
+        x1 = max(0, x1 // MCU_SIZE * MCU_SIZE)
+        y1 = max(0, y1 // MCU_SIZE * MCU_SIZE)
+        x2 = min(w, -(-x2 // MCU_SIZE) * MCU_SIZE)
+        y2 = min(h, -(-y2 // MCU_SIZE) * MCU_SIZE)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        rects.append((x1, y1, x2, y2))
+        area += (x2 - x1) * (y2 - y1)
+    if area > ROI_PATCH_MAX_FRACTION * w * h:
+        return None
+    patches = []
+    for x1, y1, x2, y2 in rects:
+        buf = CODEC.encode(np.ascontiguousarray(output[y1:y2, x1:x2]), JPEG_QUALITY)
+        patches.append({'x': x1, 'y': y1, 'w': x2 - x1, 'h': y2 - y1,
+                        'data': base64.b64encode(buf).decode('utf-8')})
+    return patches
 
 
 @app.route('/')
@@ -804,30 +1456,195 @@ def index():
     return render_template_string(HTML_TEMPLATE)
 
 
+@app.route('/worker.js')
+def worker_route():
+    return Response(WORKER_JS, mimetype='application/javascript')
+
+
+def read_upload(data):
+    """(session id, JPEG bytes) of a /process_frame JSON body"""
+    _, encoded = data.get('frame', '').split(',', 1)
+    return data.get('session'), base64.b64decode(encoded)
+
+
+def read_request(content_type, headers, body):
+    """
+    (session id, JPEG bytes, options) of a /process_frame request: either
+    JSON with a data URL, or the raw JPEG (Content-Type: image/jpeg) with
+    the session and options in X-RTIOC-* headers. Heartbeats (options
+    'heartbeat') carry no JPEG.
+    """
+    heartbeat = headers.get('x-rtioc-heartbeat') == '1'
+    if content_type.startswith('image/jpeg') or heartbeat:
+        seq = headers.get('x-rtioc-seq')
+        return headers.get('x-rtioc-session'), None if heartbeat else body, {
+            'boxes_only': headers.get('x-rtioc-boxes-only') == '1',
+            'seq': int(seq) if seq else None,
+            'heartbeat': heartbeat,
+            'id_model': headers.get('x-rtioc-id-model') or None,
+            'priority': headers.get('x-rtioc-priority') or DEFAULT_PRIORITY,
+        }
+    data = json.loads(body)
+    opts = {'boxes_only': bool(data.get('boxes_only')), 'seq': data.get('seq'),
+            'heartbeat': bool(data.get('heartbeat')), 'id_model': data.get('id_model'),
+            'priority': data.get('priority') or DEFAULT_PRIORITY}
+    if opts['heartbeat']:
+        return data.get('session'), None, opts
+    sid, img_bytes = read_upload(data)
+    return sid, img_bytes, opts
+
+
+def sched_key(sid, host):
+    """
+    Scheduler key of a request: its session, or for session-less API calls
+    the client's host — one FPS budget and queue per machine, which a client
+    can't reset by opening a new connection.
+    """
+    return sid or f"anon:{host or '?'}"
+
+
+def is_stale(session, seq):
+    """
+    True for a frame older than one the session already processed — with
+    several frames in flight a late one must not rewind the tracker.
+    Call with the session's lock held.
+    """
+    if seq is None:
+        return False
+    if seq <= session['last_seq']:
+        return True
+    session['last_seq'] = seq
+    return False
+
+
+def heartbeat_response(session, sid=None):
+    """
+    /process_frame reply to a heartbeat: fresh tracker output, no image.
+    Stream viewers get the last frame redrawn with it, so a card the tracker
+    confirms between uploads is blurred there too. Call with the lock held.
+    """
+    result = run_heartbeat(session)
+    if result is None:
+        return {'status': 'error', 'message': 'heartbeat before the first frame'}
+    faces, ids, overlays = result
+    if sid and HUB.has_viewers(sid) and session['frame'] is not None:
+        streamed = apply_redactions(session['frame'], overlays, pool=session['pool'],
+                                    name='stream')
+        HUB.publish(sid, CODEC.encode(streamed, JPEG_QUALITY))
+    return {'status': 'ok', 'faces': faces, 'ids': ids, 'overlays': overlays,
+            'size': session['size'], 'skipped': [], 'heartbeat': True}
+
+
+def decode_upload(img_bytes, session, max_side=DECODE_MAX_SIDE):
+    """
+    Decode into the session's pooled buffer; None if it isn't a usable JPEG.
+    max_side=None decodes at full resolution.
+    """
+    shape = CODEC.decoded_shape(img_bytes, max_side)
+    if shape is None:
+        return None
+    pool = session['pool']
+    # only libjpeg-turbo decodes into an existing array; OpenCV always allocates
+    pooled = pool is not None and CODEC.backend == 'turbojpeg'
+    return CODEC.decode(img_bytes, max_side=max_side,
+                        dst=pool.get('decode', shape) if pooled else None)
+
+
+def frame_response(frame, result, sid, session, boxes_only=False):
+    """
+    Feed stream viewers and build the /process_frame reply from
+    run_detection's result. boxes_only replies carry just the overlays —
+    the page blurs its own full-resolution frame.
+    """
+    output, faces, ids, overlays, skipped = result
+    if sid and HUB.has_viewers(sid):
+        # Encoded once here, shared by every viewer of /stream/<sid>.mjpg
+        streamed = apply_redactions(frame, overlays, pool=session['pool'], name='stream')
+        HUB.publish(sid, CODEC.encode(streamed, JPEG_QUALITY))
+    resp = {'status': 'ok', 'faces': faces, 'ids': ids, 'overlays': overlays,
+            'size': [frame.shape[1], frame.shape[0]], 'skipped': skipped}
+    if boxes_only:
+        return resp
+    if output is frame:
+        # Nothing was redacted — client keeps showing its own JPEG
+        resp['unchanged'] = True
+        return resp
+    patches = roi_patches(output, overlays)
+    if patches is not None:
+        resp['patches'] = patches
+    else:
+        buf = CODEC.encode(output, JPEG_QUALITY)
+        resp['frame'] = base64.b64encode(buf).decode('utf-8')
+    return resp
+
+
 @app.route('/process_frame', methods=['POST'])
 def process_frame_route():
+    arrival = time.time()
+    deadline = FrameDeadline(FRAME_BUDGET_MS) if FRAME_BUDGET_MS else None
     try:
-        data = request.json
-        frame_data = data.get('frame', '')
-        _, encoded = frame_data.split(',', 1)
-        img_bytes = base64.b64decode(encoded)
-        arr = np.frombuffer(img_bytes, dtype=np.uint8)
-        frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if frame is None:
-            return jsonify({'status': 'error'})
-        output, faces, ids = run_detection(frame)
-        _, buf = cv2.imencode('.jpg', output, [cv2.IMWRITE_JPEG_QUALITY, 60])
-        b64 = base64.b64encode(buf).decode('utf-8')
-        return jsonify({'status': 'ok', 'frame': b64, 'faces': faces, 'ids': ids})
+        sid, img_bytes, opts = read_request(request.content_type or '', request.headers,
+                                            request.get_data())
+        session = get_session(sid) if sid else default_session
+        with session['lock']:
+            if is_stale(session, opts['seq']):
+                return jsonify({'status': 'stale'})
+            if opts['heartbeat']:
+                if recorder is not None:
+                    recorder.write(sid, b'', arrival)   # empty record = heartbeat
+                return jsonify(heartbeat_response(session, sid))
+            key = sched_key(sid, request.remote_addr)
+            scheduler.admit(key, opts['priority'])
+            # recorded only once accepted, so a replay sees what the tracker saw
+            if recorder is not None:
+                recorder.write(sid, img_bytes, arrival)
+            frame = decode_upload(img_bytes, session)
+            if frame is None:
+                return jsonify({'status': 'error'})
+            with scheduler.slot(key, opts['priority']):
+                result = run_detection(frame, annotate=False, session=session,
+                                       deadline=deadline, jpeg=img_bytes,
+                                       redact=not opts['boxes_only'], id_model=opts['id_model'])
+            return jsonify(frame_response(frame, result, sid, session, opts['boxes_only']))
+    except Throttled as e:
+        return jsonify({'status': 'throttled', 'message': str(e)})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
 
+def server_stats():
+    return {
+        'sessions': len(sessions),
+        'pid': os.getpid(),
+        'memory': memory_info(),   # rss / pss / shared / private bytes
+        'frame_cache': frame_cache.stats() if frame_cache is not None else None,
+        'models': model_registry.stats(),
+        'scheduler': scheduler.stats(),
+    }
+
+
+@app.route('/stats')
+def stats_route():
+    return jsonify(server_stats())
+
+
+@app.route('/healthz')
+def healthz_route():
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/stream/<key>.mjpg')
+def stream_route(key):
+    return Response(HUB.stream(key),
+                    mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+
+
 if __name__ == '__main__':
+    port = int(os.environ.get('RTIOC_PORT', 5000))
     print("\n" + "=" * 70)
     print("🔒 RTIOC - Real-Time Identity and Object Concealment")
     print("=" * 70)
-    print("➡️  Open: http://localhost:5000")
+    print(f"➡️  Open: http://localhost:{port}")
     print("=" * 70 + "\n")
-    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
 
@@ -0,0 +1,244 @@
+"""
+RTIOC on asyncio — ASGI entry point
+
+Same routes as the Flask app (/, /process_frame, /stats,
+/stream/<key>.mjpg) with the same detection code, but connections live
+on one event loop instead of one blocking thread each, so idle and slow
+clients (and MJPEG viewers) cost almost nothing. Reading the request,
+JSON parsing and writing the reply happen on the loop; the CPU-bound
+stages go to their own bounded thread pools:
+
+    decode     JPEG -> pooled frame              DECODE_WORKERS threads
+    inference  run_detection                     INFER_WORKERS threads
+    encode     stream publish + patches / JPEG   ENCODE_WORKERS threads
+
+The three pools share the cores instead of each assuming it has all of
+them: inference keeps its thread, decode and encode split the rest, so
+a burst never runs more CPU threads than there are cores. At most
+STAGE_DEPTH requests per worker wait for a stage; the rest wait on the
+loop. Frames of one session are processed one at a time, in order.
+Before inference, frames wait on the loop for a slot from rtioc.scheduler,
+which orders them fairly across sessions and priority classes.
+
+    pip install uvicorn
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import json
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import app_final3 as rtioc
+from inference import FrameDeadline
+from stream import BOUNDARY, HUB, STREAM_IDLE_TIMEOUT, mjpeg_part
+
+CORES = os.cpu_count() or 1
+INFER_WORKERS  = 1       # torch already spreads one forward pass over the cores
+DECODE_WORKERS = max(1, (CORES - INFER_WORKERS) // 2)   # decode + encode + inference <= cores
+ENCODE_WORKERS = max(1, (CORES - INFER_WORKERS) // 2)
+STAGE_DEPTH    = 2       # queued requests per worker before callers wait on the loop
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class Stage:
+    """A bounded thread pool: runs blocking work without blocking the loop"""
+
+    def __init__(self, name, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.slots = asyncio.Semaphore(workers * STAGE_DEPTH)
+
+    async def run(self, fn, *args, **kwargs):
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+
+_stages = {}
+_session_locks = weakref.WeakValueDictionary()   # sid -> asyncio.Lock while in use
+
+
+def stage(name):
+    # created lazily so the semaphores belong to the server's event loop
+    if name not in _stages:
+        workers = {'decode': DECODE_WORKERS, 'inference': INFER_WORKERS,
+                   'encode': ENCODE_WORKERS}[name]
+        _stages[name] = Stage(name, workers)
+    return _stages[name]
+
+
+def session_lock(sid):
+    lock = _session_locks.get(sid)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[sid] = lock
+    return lock
+
+
+async def scheduled(sid, priority, fn, *args, **kwargs):
+    """Wait on the loop for a FairScheduler slot, then run fn on the inference stage"""
+    loop = asyncio.get_running_loop()
+    granted = loop.create_future()
+
+    def grant():
+        loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+    ticket = rtioc.scheduler.submit(sid, priority, grant)
+    try:
+        await granted
+        return await stage('inference').run(fn, *args, **kwargs)
+    finally:
+        rtioc.scheduler.cancel(ticket)   # frees the slot, or leaves the queue if never granted
+
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, body, content_type):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type.encode()),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, payload, status=200):
+    await send_response(send, status, json.dumps(payload).encode(), 'application/json')
+
+
+async def process_frame(scope, receive, send):
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    arrival = time.time()
+    deadline = FrameDeadline(rtioc.FRAME_BUDGET_MS) if rtioc.FRAME_BUDGET_MS else None
+    body = await read_body(receive)
+    if body is None:
+        return await send_json(send, {'status': 'error', 'message': 'bad request body'}, 400)
+    try:
+        sid, img_bytes, opts = rtioc.read_request(headers.get('content-type', ''), headers, body)
+        boxes_only = opts['boxes_only']
+        session = rtioc.get_session(sid) if sid else rtioc.default_session
+        async with session_lock(sid):
+            if rtioc.is_stale(session, opts['seq']):
+                return await send_json(send, {'status': 'stale'})
+            if opts['heartbeat']:
+                if rtioc.recorder is not None:
+                    rtioc.recorder.write(sid, b'', arrival)   # empty record = heartbeat
+                # redraws the stream for viewers: CPU work, so off the loop
+                resp = await stage('encode').run(rtioc.heartbeat_response, session, sid)
+                return await send_json(send, resp)
+            key = rtioc.sched_key(sid, (scope.get('client') or (None,))[0])
+            rtioc.scheduler.admit(key, opts['priority'])
+            # recorded only once accepted, so a replay sees what the tracker saw
+            if rtioc.recorder is not None:
+                rtioc.recorder.write(sid, img_bytes, arrival)
+            frame = await stage('decode').run(rtioc.decode_upload, img_bytes, session)
+            if frame is None:
+                return await send_json(send, {'status': 'error'})
+            result = await scheduled(
+                key, opts['priority'], rtioc.run_detection, frame, annotate=False,
+                session=session, deadline=deadline, jpeg=img_bytes, redact=not boxes_only,
+                id_model=opts['id_model'])
+            resp = await stage('encode').run(rtioc.frame_response, frame, result, sid,
+                                             session, boxes_only)
+    except rtioc.Throttled as e:
+        resp = {'status': 'throttled', 'message': str(e)}
+    except Exception as e:
+        resp = {'status': 'error', 'message': str(e)}
+    await send_json(send, resp)
+
+
+async def stream(key, receive, send):
+    """MJPEG viewer: waits on the loop, woken by FrameHub.publish from any thread"""
+    loop = asyncio.get_running_loop()
+    wake_event = asyncio.Event()
+    closed = False
+
+    def wake(k):
+        if k == key:
+            loop.call_soon_threadsafe(wake_event.set)
+
+    async def watch_disconnect():
+        nonlocal closed
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        closed = True
+        wake_event.set()
+
+    HUB.watch(key, wake)
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', f'multipart/x-mixed-replace; boundary={BOUNDARY}'.encode()),
+            (b'cache-control', b'no-cache')]})
+        last = 0
+        while not closed:
+            seq, jpg = HUB.latest(key)
+            if seq > last:
+                last = seq
+                for chunk in mjpeg_part(jpg):
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                continue
+            wake_event.clear()
+            if HUB.latest(key)[0] > last:
+                continue
+            try:
+                await asyncio.wait_for(wake_event.wait(), STREAM_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                break
+        if not closed:
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        HUB.unwatch(key, wake)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for s in _stages.values():
+                    s.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    path, method = scope['path'], scope['method']
+    if path == '/' and method == 'GET':
+        await send_response(send, 200, rtioc.HTML_TEMPLATE.encode(), 'text/html; charset=utf-8')
+    elif path == '/worker.js' and method == 'GET':
+        await send_response(send, 200, rtioc.WORKER_JS.encode(), 'application/javascript')
+    elif path == '/process_frame' and method == 'POST':
+        await process_frame(scope, receive, send)
+    elif path == '/stats' and method == 'GET':
+        await send_json(send, rtioc.server_stats())
+    elif path == '/healthz' and method == 'GET':
+        await send_json(send, {'status': 'ok'})
+    elif path.startswith('/stream/') and path.endswith('.mjpg') and method == 'GET':
+        await stream(path[len('/stream/'):-len('.mjpg')], receive, send)
+    else:
+        await send_response(send, 404, b'Not Found', 'text/plain')
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('RTIOC_PORT', 5000))
+    print(f"➡️  Open: http://localhost:{port}  (asyncio server)")
+    uvicorn.run(app, host='0.0.0.0', port=port, log_level='warning')
@@ -0,0 +1,253 @@
+"""
+RTIOC CPU auto-tuner
+
+torch, OpenCV and several workers all default to using every core, so
+together they oversubscribe the machine. This sweeps the settings on
+this machine with the synthetic benchmark workload (decode +
+run_detection on generated scenes, as in `benchmark.py synthetic`) and
+writes the best ones to tuning.json, which the server loads at startup:
+
+    torch_threads / workers   together, never more threads than cores
+    interop_threads           torch inter-op pool
+    cv2_threads               OpenCV pool (resize, blur, colour conversion)
+    process_size              only sizes whose recall stays within
+                              --max-recall-drop of the default's
+
+The sweep is staged: each stage varies one setting and keeps the best
+value for the next. Every trial runs in fresh processes (one per worker,
+started together), because torch fixes its inter-op pool on first use.
+
+    python autotune.py --objective throughput
+    python autotune.py --objective latency --sizes 256,320,416 --duration 15
+    python autotune.py --stub          # try the sweep without weights
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from tuning import TUNING_PATH, save_tuning
+
+TRIAL_PREFIX  = 'RTIOC-TRIAL '   # child output lines meant for the tuner (the app prints too)
+WARMUP_FRAMES = 10
+TRIAL_TIMEOUT = 300
+
+
+def powers_of_two(limit):
+    values, v = [], 1
+    while v <= limit:
+        values.append(v)
+        v *= 2
+    if limit not in values:
+        values.append(limit)
+    return values
+
+
+# ── Trial (child process) ─────────────────────────────────────────
+
+def trial(args):
+    """Run the workload for --duration seconds after a 'go' line; report one JSON line"""
+    import numpy as np
+
+    import app_final3 as rtioc
+    from benchmark import matched
+    from synthetic import Scene
+
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    scene = Scene(w, h, args.frames, seed=args.seed)
+    frames = [(rtioc.CODEC.encode(frame, 70), truth) for frame, truth in scene]
+    session = rtioc.new_session()
+    # the scene loops, so with the repeated-frame cache on every pass after
+    # the first would time cache lookups instead of inference
+    rtioc.frame_cache = None
+    kinds = {'face': ('speaker', 'face'), 'id': ('id',)}
+    found = [0, 0]
+
+    def step(i, count):
+        jpg, truth = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        img = rtioc.CODEC.decode(jpg, max_side=rtioc.DECODE_MAX_SIDE)
+        _, _, _, overlays, _ = rtioc.run_detection(img, annotate=False, session=session)
+        ms = (time.perf_counter() - t0) * 1000
+        if count:
+            scale = img.shape[1] / w
+            for k, names in kinds.items():
+                boxes = [o['box'] for o in overlays if o['kind'] in names]
+                pred = np.array(boxes, dtype=np.float32).reshape(-1, 4) / scale
+                found[0] += int(matched(truth[k], pred, args.iou).sum())
+                found[1] += len(truth[k])
+        return ms
+
+    for i in range(WARMUP_FRAMES):
+        step(i, False)
+    print(TRIAL_PREFIX + 'ready', flush=True)
+    sys.stdin.readline()
+
+    latencies = []
+    start = time.perf_counter()
+    i = WARMUP_FRAMES
+    while time.perf_counter() - start < args.duration:
+        latencies.append(step(i, True))
+        i += 1
+    result = {'frames': len(latencies), 'seconds': time.perf_counter() - start,
+              'latencies': latencies, 'matched': found[0], 'truth': found[1]}
+    print(TRIAL_PREFIX + json.dumps(result), flush=True)
+
+
+def read_trial_line(proc):
+    """Next line the child meant for us, or None if it exited"""
+    for line in proc.stdout:
+        if line.startswith(TRIAL_PREFIX):
+            return line[len(TRIAL_PREFIX):].strip()
+    return None
+
+
+# ── Sweep (parent) ─────────────────────────────────────────────────
+
+def run_trial(settings, args):
+    """Measure one configuration: settings['workers'] processes running at once"""
+    fd, path = tempfile.mkstemp(prefix='rtioc-trial-', suffix='.json')
+    os.close(fd)
+    save_tuning(path, {k: v for k, v in settings.items() if k != 'workers'})
+    env = dict(os.environ, RTIOC_TUNING=path)
+    if args.stub:
+        env['RTIOC_STUB_MODELS'] = '1'
+    cmd = [sys.executable, os.path.abspath(__file__), '--trial', '--size', args.size,
+           '--frames', str(args.frames), '--duration', str(args.duration), '--iou', str(args.iou)]
+    procs = [subprocess.Popen(cmd + ['--seed', str(i)], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True, env=env)
+             for i in range(settings['workers'])]
+    try:
+        # everyone loads and warms up first, so the measured windows overlap
+        if any(read_trial_line(p) != 'ready' for p in procs):
+            return None
+        for p in procs:
+            p.stdin.write('go\n')
+            p.stdin.flush()
+        results = []
+        for p in procs:
+            line = read_trial_line(p)
+            if line is None:
+                return None
+            results.append(json.loads(line))
+            p.wait(TRIAL_TIMEOUT)
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.kill()
+                p.wait()
+        os.remove(path)
+
+    latencies = sorted(ms for r in results for ms in r['latencies']) or [0.0]
+    truth = sum(r['truth'] for r in results)
+    return {
+        'fps': sum(r['frames'] for r in results) / max(r['seconds'] for r in results),
+        'p50_ms': statistics.median(latencies),
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'recall': sum(r['matched'] for r in results) / truth if truth else None,
+    }
+
+
+def score(measured, objective):
+    """Higher is better"""
+    if measured is None:
+        return float('-inf')
+    return measured['fps'] if objective == 'throughput' else -measured['p99_ms']
+
+
+COLUMNS = ('workers', 'torch_threads', 'interop_threads', 'cv2_threads', 'process_size')
+
+
+def print_trial(settings, measured):
+    cols = '  '.join(f"{settings[k]:>{len(k)}}" for k in COLUMNS)
+    if measured is None:
+        print(f"  {cols}  failed")
+        return
+    recall = f"{measured['recall']:.3f}" if measured['recall'] is not None else "  n/a"
+    print(f"  {cols}  {measured['fps']:7.1f}  {measured['p50_ms']:7.1f}"
+          f"  {measured['p99_ms']:7.1f}  {recall:>6}")
+
+
+def sweep(args):
+    cores = os.cpu_count() or 1
+    sizes = [int(v) for v in args.sizes.split(',')]
+    max_workers = min(args.max_workers or cores, cores)
+    best = {'workers': 1, 'torch_threads': cores, 'interop_threads': 1,
+            'cv2_threads': cores, 'process_size': args.default_size}
+    tried = {}
+
+    def measure(settings):
+        key = tuple(settings[k] for k in COLUMNS)
+        if key not in tried:
+            tried[key] = run_trial(settings, args)
+            print_trial(settings, tried[key])
+        return tried[key]
+
+    def stage(name, candidates):
+        nonlocal best
+        print(f"\n{name}")
+        results = [(c, measure(c)) for c in candidates]
+        if name.startswith('process_size'):
+            base = measure(dict(best, process_size=args.default_size))
+            if base is not None and base['recall'] is not None:
+                floor = base['recall'] - args.max_recall_drop
+                results = [(c, m) for c, m in results
+                           if m is not None and (m['recall'] or 0.0) >= floor]
+        if results:
+            best = max(results, key=lambda r: score(r[1], args.objective))[0]
+
+    print(f"🔧 Tuning for {args.objective} on {cores} cores — {args.duration:g}s per trial")
+    print(f"  {'  '.join(COLUMNS)}  {'fps':>7}  {'p50 ms':>7}  {'p99 ms':>7}  {'recall':>6}")
+    stage("workers x torch threads", [
+        dict(best, workers=w, torch_threads=t, cv2_threads=t)
+        for w in powers_of_two(max_workers) for t in powers_of_two(cores // w)])
+    t = best['torch_threads']
+    stage("interop threads", [dict(best, interop_threads=n) for n in powers_of_two(min(t, 4))])
+    stage("cv2 threads", [dict(best, cv2_threads=n)
+                          for n in sorted({1, t, max(1, cores // best['workers'])})])
+    stage(f"process_size (recall within {args.max_recall_drop:g} of {args.default_size})",
+          [dict(best, process_size=s) for s in sizes])
+    return best, tried[tuple(best[k] for k in COLUMNS)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC CPU auto-tuner")
+    parser.add_argument('--objective', choices=('throughput', 'latency'), default='throughput',
+                        help="throughput = total fps over all workers, latency = p99 per frame")
+    parser.add_argument('--out', default=TUNING_PATH)
+    parser.add_argument('--duration', type=float, default=10.0, help="measured seconds per trial")
+    parser.add_argument('--size', default='640x480', help="generated frame size WxH")
+    parser.add_argument('--frames', type=int, default=120, help="frames in the generated scene")
+    parser.add_argument('--sizes', default='256,320,416', help="PROCESS_SIZE candidates")
+    parser.add_argument('--default-size', type=int, default=320,
+                        help="PROCESS_SIZE whose recall the others are held to")
+    parser.add_argument('--max-recall-drop', type=float, default=0.02)
+    parser.add_argument('--max-workers', type=int, default=0, help="default: one per core")
+    parser.add_argument('--iou', type=float, default=0.5)
+    parser.add_argument('--stub', action='store_true', help="stub models (no weights needed)")
+    parser.add_argument('--trial', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        return trial(args)
+
+    best, measured = sweep(args)
+    if measured is None:
+        raise SystemExit("❌ ERROR: every trial failed — does `python app_final3.py` start?")
+    save_tuning(args.out, best, args.objective,
+                {k: round(v, 3) if v is not None else None for k, v in measured.items()})
+    print(f"\n✅ Best for {args.objective}: "
+          + ", ".join(f"{k}={best[k]}" for k in COLUMNS))
+    print(f"   {measured['fps']:.1f} fps, p99 {measured['p99_ms']:.1f} ms — written to {args.out}")
+    print("   app_final3.py and prefork.py load it at startup (RTIOC_TUNING overrides the path)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+RTIOC benchmark suite
+
+Usage:
+    python benchmark.py codec [--image frame.jpg] [--size 1280x720]
+    python benchmark.py rect  [--image frame.jpg] [--size 320x240]
+    python benchmark.py pipeline [--image frame.jpg]
+    python benchmark.py unified --images data/val_frames [--labels data/val_labels]
+    python benchmark.py synthetic [--scenes 3 --frames 120 --size 640x480]
+
+Each section prints per-frame timings so changes to the pipeline can be
+compared against the previous behaviour on the same machine.
+"""
+
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from codec import JpegCodec, DEFAULT_QUALITY
+
+
+def make_test_frame(w, h, seed=0):
+    """Camera-like test frame: gradients, shapes and sensor noise"""
+    rng = np.random.default_rng(seed)
+    xs = np.linspace(0, 255, w, dtype=np.float32)
+    ys = np.linspace(0, 255, h, dtype=np.float32)
+    frame = np.empty((h, w, 3), dtype=np.float32)
+    frame[..., 0] = xs[None, :]
+    frame[..., 1] = ys[:, None]
+    frame[..., 2] = (xs[None, :] + ys[:, None]) / 2
+    frame = frame.astype(np.uint8)
+    for _ in range(12):
+        x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+        r = int(rng.integers(10, max(11, min(w, h) // 4)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(frame, (x, y), r, color, -1)
+    noise = rng.normal(0, 6, frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def load_frame(args, default_size):
+    if args.image:
+        frame = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise SystemExit(f"❌ ERROR: could not read {args.image}")
+        return frame
+    w, h = (int(v) for v in (args.size or default_size).lower().split('x'))
+    return make_test_frame(w, h)
+
+
+def time_call(fn, iterations, warmup=3):
+    """Run fn repeatedly and return per-call times in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def report(name, times):
+    times = sorted(times)
+    p50 = statistics.median(times)
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    print(f"  {name:<34} mean {statistics.fmean(times):7.2f} ms"
+          f"   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+
+
+# ── Sections ─────────────────────────────────────────────────────
+
+def bench_codec(args):
+    frame = load_frame(args, '1280x720')
+    h, w = frame.shape[:2]
+    _, jpg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, DEFAULT_QUALITY])
+    jpg = jpg.tobytes()
+    arr = np.frombuffer(jpg, dtype=np.uint8)
+    n = args.iterations
+
+    print(f"\nCodec — {w}x{h} frame, {len(jpg) / 1024:.1f} KiB JPEG, {n} iterations")
+
+    print("OpenCV (current path)")
+    report("imdecode", time_call(lambda: cv2.imdecode(arr, cv2.IMREAD_COLOR), n))
+    report("imencode q60", time_call(
+        lambda: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, DEFAULT_QUALITY]), n))
+
+    codecs = [JpegCodec(use_turbo=False)]
+    turbo = JpegCodec()
+    if turbo.backend == 'turbojpeg':
+        codecs.append(turbo)
+    else:
+        print("(PyTurboJPEG not available — only the OpenCV backend is measured)")
+
+    for codec in codecs:
+        print(f"JpegCodec [{codec.backend}]")
+        report("decode full", time_call(lambda: codec.decode(jpg), n))
+        report("decode full (reused buffer)", time_call(lambda: codec.decode(jpg, reuse=True), n))
+        if args.max_side:
+            out = codec.decode(jpg, max_side=args.max_side)
+            label = f"decode scaled -> {out.shape[1]}x{out.shape[0]}"
+            report(label, time_call(
+                lambda: codec.decode(jpg, max_side=args.max_side, reuse=True), n))
+        report("encode q60", time_call(lambda: codec.encode(frame), n))
+
+
+def bench_rect(args):
+    """
+    Previous path vs rect inference for every loaded model. With .pt weights
+    ultralytics already pads its letterbox only up to the stride, so the
+    previous path ran the same rect shape and the only saving is the ID
+    upscale; a square input is what a static export (INFER_EXPORT) ran.
+    """
+    from ultralytics.utils.torch_utils import get_flops
+
+    import app_final3 as rtioc
+    from inference import rect_imgsz, square_padding
+
+    frame = load_frame(args, '320x240')
+    h, w = frame.shape[:2]
+    n = args.iterations
+    upscaled = cv2.resize(frame, (int(w * rtioc.ID_UPSCALE), int(h * rtioc.ID_UPSCALE)),
+                          interpolation=cv2.INTER_CUBIC)
+
+    registry = rtioc.model_registry
+    models = [('face', registry.get('face'), rtioc.FACE_CONFIDENCE, frame, rtioc.PROCESS_SIZE),
+              ('id', registry.get('id'), rtioc.ID_CONFIDENCE, upscaled, rtioc.ID_RECT_SIZE)]
+    if 'id2' in registry:
+        models.append(('id2', registry.get('id2'), rtioc.ID_CONFIDENCE, upscaled,
+                       rtioc.ID_RECT_SIZE))
+
+    size = rtioc.PROCESS_SIZE
+    print(f"\nRect inference — {w}x{h} frame, device {rtioc.DEVICE}, {n} iterations")
+    print(f"  static exports only: a square {size}x{size} export is "
+          f"{square_padding(frame.shape, size):.0%} padding")
+    for name, model, conf, prev_src, rect_size in models:
+        # what predict(imgsz=size) really ran on .pt weights: auto letterbox
+        prev = rect_imgsz(prev_src.shape, size)
+        rect = rect_imgsz(frame.shape, rect_size)
+        prev_flops = get_flops(model.model, list(prev))
+        sq_flops = get_flops(model.model, [size, size])
+        rect_flops = get_flops(model.model, list(rect))
+        print(f"{name}: {prev_flops:.2f} GFLOPs previous {prev[1]}x{prev[0]} -> "
+              f"{rect_flops:.2f} GFLOPs rect {rect[1]}x{rect[0]} "
+              f"(square export: {sq_flops:.2f})")
+        report(f"previous path ({prev_src.shape[1]}x{prev_src.shape[0]} source)", time_call(
+            lambda: model.predict(source=prev_src, conf=conf, verbose=False,
+                                  imgsz=size, device=rtioc.DEVICE), n))
+        report("rect", time_call(
+            lambda: model.predict(source=frame, conf=conf, verbose=False,
+                                  imgsz=rect, device=rtioc.DEVICE), n))
+
+
+def bench_pipeline(args):
+    """Per-frame /process_frame work and its allocations, with and without the pool"""
+    import app_final3 as rtioc
+
+    frame = load_frame(args, '320x240')
+    jpg = rtioc.CODEC.encode(frame, 50)
+    n = args.iterations
+
+    def make_step(session):
+        def step():
+            img = rtioc.decode_upload(jpg, session)
+            output, _, _, overlays, _ = rtioc.run_detection(img, annotate=False, session=session)
+            if output is not img and rtioc.roi_patches(output, overlays) is None:
+                rtioc.CODEC.encode(output, rtioc.JPEG_QUALITY)
+        return step
+
+    print(f"\nPipeline — {frame.shape[1]}x{frame.shape[0]} frame, {n} iterations")
+    for label, session in (('no pool', rtioc.new_session(pooled=False)),
+                           ('session pool', rtioc.new_session())):
+        step = make_step(session)
+        report(label, time_call(step, n))
+        tracemalloc.start()
+        peaks = []
+        for _ in range(n):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            step()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        print(f"  {'':<34} allocations: {statistics.fmean(peaks) / 1024:8.1f} KiB/frame peak")
+    print("  (Python/NumPy heap only — torch's own allocator is not traced)")
+
+
+def matched(truth, predicted, iou_thr=0.5):
+    """Per ground-truth box: is it covered by a prediction at iou_thr"""
+    from boxes import iou_matrix
+
+    if not len(truth) or not len(predicted):
+        return np.zeros(len(truth), dtype=bool)
+    return iou_matrix(truth, predicted).max(axis=1) >= iou_thr
+
+
+def recall(truth, predicted, iou_thr=0.5):
+    """(matched, total) ground-truth boxes covered by a prediction at iou_thr"""
+    return int(matched(truth, predicted, iou_thr).sum()), len(truth)
+
+
+def bench_unified(args):
+    """Separate face + ID models vs the unified model: recall and latency"""
+    import app_final3 as rtioc
+    from train_unified import list_images, read_yolo_labels
+
+    if 'unified' not in rtioc.model_registry:
+        raise SystemExit(f"❌ ERROR: no unified model at {rtioc.MODEL_PATH_UNIFIED} "
+                         "(train one with train_unified.py)")
+    if not args.images:
+        raise SystemExit("❌ ERROR: --images is required for this section")
+
+    classes = rtioc.UNIFIED_CLASSES
+    times = {'separate': [], 'unified': []}
+    hits = {(mode, k): [0, 0] for mode in times for k in classes}
+    for path in list_images(args.images):
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            continue
+        h, w = frame.shape[:2]
+
+        t0 = time.perf_counter()
+        faces = rtioc.detect_faces(frame)
+        ids = rtioc.detect_ids(frame, rtioc.new_session())
+        times['separate'].append((time.perf_counter() - t0) * 1000)
+        separate = {'face': faces, 'id': ids}
+
+        t0 = time.perf_counter()
+        faces, ids = rtioc.detect_unified(frame)
+        times['unified'].append((time.perf_counter() - t0) * 1000)
+        unified = {'face': faces, 'id': ids}
+
+        if args.labels:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            labels = read_yolo_labels(os.path.join(args.labels, stem + '.txt'), w, h)
+            truth = {k: np.array([b[1:] for b in labels if b[0] == idx]).reshape(-1, 4)
+                     for k, idx in classes.items()}
+        else:
+            truth = separate   # no labels: how much of the teachers' output is kept
+        for mode, found in (('separate', separate), ('unified', unified)):
+            for k in classes:
+                m, total = recall(truth[k], found[k], args.iou)
+                hits[(mode, k)][0] += m
+                hits[(mode, k)][1] += total
+
+    reference = "ground truth" if args.labels else "separate models"
+    print(f"\nUnified vs separate — {len(times['unified'])} images, recall vs {reference}")
+    for mode in times:
+        report(mode, times[mode])
+        for k in classes:
+            m, total = hits[(mode, k)]
+            print(f"  {'':<34} {k:<5} recall {m / total if total else float('nan'):.3f}"
+                  f" ({m}/{total})")
+
+
+SIZE_BUCKETS = (('small', 0, 40), ('medium', 40, 96), ('large', 96, float('inf')))
+
+
+def bench_synthetic(args):
+    """run_detection speed and recall on generated scenes with known boxes"""
+    import app_final3 as rtioc
+    from synthetic import Scene
+
+    w, h = (int(v) for v in (args.size or '640x480').lower().split('x'))
+    kinds = {'face': ('speaker', 'face'), 'id': ('id',)}
+    hits = {(k, b[0]): [0, 0] for k in kinds for b in SIZE_BUCKETS}
+    times = []
+    for s in range(args.scenes):
+        scene = Scene(w, h, args.frames, seed=s)
+        session = rtioc.new_session()
+        for frame, truth in scene:
+            jpg = rtioc.CODEC.encode(frame, 70)
+            t0 = time.perf_counter()
+            img = rtioc.CODEC.decode(jpg, max_side=rtioc.DECODE_MAX_SIDE)
+            _, _, _, overlays, _ = rtioc.run_detection(img, annotate=False,
+                                                       session=session, jpeg=jpg)
+            times.append((time.perf_counter() - t0) * 1000)
+
+            scale = img.shape[1] / frame.shape[1]
+            for k, names in kinds.items():
+                found = np.array([o['box'] for o in overlays if o['kind'] in names],
+                                 dtype=np.float32).reshape(-1, 4) / scale
+                widths = truth[k][:, 2] - truth[k][:, 0]
+                ok = matched(truth[k], found, args.iou)
+                for name, lo, hi in SIZE_BUCKETS:
+                    sel = (widths >= lo) & (widths < hi)
+                    hits[(k, name)][0] += int(ok[sel].sum())
+                    hits[(k, name)][1] += int(sel.sum())
+
+    print(f"\nSynthetic scenes — {args.scenes} x {args.frames} frames at {w}x{h}, "
+          f"recall at IoU {args.iou}")
+    report("decode + run_detection", times)
+    for k in kinds:
+        m = sum(hits[(k, b[0])][0] for b in SIZE_BUCKETS)
+        total = sum(hits[(k, b[0])][1] for b in SIZE_BUCKETS)
+        parts = []
+        for name, lo, hi in SIZE_BUCKETS:
+            bm, bt = hits[(k, name)]
+            parts.append(f"{name} {bm / bt if bt else float('nan'):.3f}")
+        print(f"  {k:<5} recall {m / total if total else float('nan'):.3f} ({m}/{total})"
+              f"   by width: {', '.join(parts)}")
+    print("  (faces count as found when detected, the unblurred speaker included;"
+          " IDs only once the tracker confirms them)")
+
+
+SECTIONS = {
+    'codec': bench_codec,
+    'rect': bench_rect,
+    'pipeline': bench_pipeline,
+    'unified': bench_unified,
+    'synthetic': bench_synthetic,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC benchmark suite")
+    parser.add_argument('section', choices=sorted(SECTIONS))
+    parser.add_argument('--image', help="frame to benchmark instead of a generated one")
+    parser.add_argument('--size', help="generated frame size WxH (default depends on section)")
+    parser.add_argument('--images', help="folder of frames (unified section)")
+    parser.add_argument('--labels', help="YOLO ground-truth labels for --images")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--scenes', type=int, default=3, help="generated scenes (synthetic)")
+    parser.add_argument('--frames', type=int, default=120, help="frames per scene (synthetic)")
+    parser.add_argument('--iou', type=float, default=0.5, help="IoU for a box to count as found")
+    parser.add_argument('--max-side', type=int, default=640,
+                        help="long side for DCT-scaled decode (0 to skip)")
+    args = parser.parse_args()
+    SECTIONS[args.section](args)
+
+
+if __name__ == '__main__':
+    main()
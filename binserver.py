@@ -0,0 +1,175 @@
+"""
+Binary redaction service for other backends (protocol in wire.py)
+
+One thread reads requests off each connection while another runs them
+through the same pipeline as /process_frame and writes the replies in
+order, so a pipelining client keeps the socket and the models busy.
+
+    python binserver.py [--port 5050]
+Client side: rtioc_client.RedactionClient.
+"""
+
+import argparse
+import queue
+import socket
+import socketserver
+import threading
+
+import numpy as np
+
+import wire
+from inference import FrameDeadline
+
+PIPELINE_DEPTH = 8     # requests read ahead per connection
+PUT_POLL       = 0.5   # seconds the reader waits on a full queue before rechecking
+
+
+def redact(rtioc, session_id, fmt, flags, width, height, payload, key=None):
+    """
+    Run one request; returns the response (boxes, payload, width, height).
+    session_id must not be empty — the handler gives anonymous requests one
+    session per connection, so they never share pooled buffers or a tracker.
+    key is the scheduler key (default session_id): anonymous connections
+    from one host share an FPS budget and a queue.
+    """
+    key = key or session_id
+    session = rtioc.get_session(session_id)
+    priority = 'bulk' if flags & wire.FLAG_BULK else rtioc.DEFAULT_PRIORITY
+    deadline = FrameDeadline(rtioc.FRAME_BUDGET_MS) if rtioc.FRAME_BUDGET_MS else None
+    boxes_only = bool(flags & wire.FLAG_BOXES_ONLY)
+    # The session's pooled decode/output buffers are reused by its next frame:
+    # hold its lock until the reply no longer points into them
+    with session['lock']:
+        rtioc.scheduler.admit(key, priority)
+        if fmt == wire.FORMAT_JPEG:
+            if rtioc.recorder is not None:
+                rtioc.recorder.write(session_id, payload)
+            # full resolution: boxes and the returned image stay in the
+            # caller's pixel coordinates, as they do for BGR requests
+            frame = rtioc.decode_upload(payload, session, max_side=None)
+            if frame is None:
+                raise ValueError("could not decode JPEG")
+            jpeg = payload
+        elif fmt == wire.FORMAT_BGR:
+            if len(payload) != width * height * 3:
+                raise ValueError(f"expected {width}x{height}x3 bytes, got {len(payload)}")
+            frame = np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3)
+            jpeg = None
+        else:
+            raise ValueError(f"unknown format {fmt}")
+
+        with rtioc.scheduler.slot(key, priority):
+            output, _, _, overlays, _ = rtioc.run_detection(frame, annotate=False,
+                                                            session=session,
+                                                            deadline=deadline, jpeg=jpeg,
+                                                            redact=not boxes_only)
+        boxes = [(wire.KINDS.index(o['kind']), o['blurred'], *o['box']) for o in overlays]
+        if boxes_only:
+            image = b''
+        elif fmt == wire.FORMAT_JPEG:
+            image = payload if output is frame else rtioc.CODEC.encode(output, rtioc.JPEG_QUALITY)
+        elif output is frame:
+            image = payload   # nothing redacted — the request's own bytes
+        else:
+            image = output.tobytes()   # copied: output is the session's pooled array
+        return boxes, image, output.shape[1], output.shape[0]
+
+
+class RedactionHandler(socketserver.BaseRequestHandler):
+    rtioc = None
+
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.pending = queue.Queue(PIPELINE_DEPTH)
+        self.stopped = threading.Event()
+        host, port = self.client_address[:2]
+        self.anonymous = f"bin:{host}:{port}"   # session of requests without an id
+        self.anonymous_key = f"anon:{host}"      # ...and their scheduler key
+
+    def enqueue(self, item):
+        """Queue for the writer; False once the writer has gone away"""
+        while not self.stopped.is_set():
+            try:
+                self.pending.put(item, timeout=PUT_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_loop(self):
+        try:
+            while self.enqueue(wire.read_request(self.request)):
+                pass
+        except Exception as e:
+            # anything that ends the reader must reach the writer, or it waits forever
+            self.enqueue(e)
+
+    def handle(self):
+        reader = threading.Thread(target=self.read_loop, daemon=True)
+        reader.start()
+        try:
+            self.write_loop()
+        finally:
+            # the reader may be blocked on a full queue or in recv: stop it,
+            # unblock the socket and drop whatever it had read ahead
+            self.stopped.set()
+            try:
+                self.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            reader.join()
+            while not self.pending.empty():
+                self.pending.get_nowait()
+
+    def write_loop(self):
+        sock = self.request
+        while True:
+            item = self.pending.get()
+            if isinstance(item, Exception):
+                if not isinstance(item, OSError):   # not just the client hanging up
+                    print(f"⚠️  {self.client_address[0]}: {item}")
+                return
+            request_id, session_id, fmt, flags, width, height, payload = item
+            try:
+                boxes, image, w, h = redact(self.rtioc, session_id or self.anonymous, fmt,
+                                            flags, width, height, payload,
+                                            key=session_id or self.anonymous_key)
+                head, body = wire.pack_response(request_id, wire.STATUS_OK, fmt, boxes,
+                                                image, w, h)
+            except Exception as e:
+                head, body = wire.pack_response(request_id, wire.STATUS_ERROR, fmt,
+                                                payload=str(e).encode('utf-8'))
+            try:
+                sock.sendall(head)
+                if body:
+                    sock.sendall(body)
+            except OSError:
+                return
+
+
+class RedactionServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC binary redaction service")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=wire.DEFAULT_PORT)
+    args = parser.parse_args()
+
+    import app_final3 as rtioc
+
+    RedactionHandler.rtioc = rtioc
+    server = RedactionServer((args.host, args.port), RedactionHandler)
+    print(f"🔌 Binary redaction service on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
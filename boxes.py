@@ -0,0 +1,131 @@
+"""
+Array box operations for RTIOC
+
+All boxes are (N, 4) arrays of x1, y1, x2, y2 in pixel coordinates.
+"""
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """(N, M) Intersection over Union of every box in a against every box in b"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def nms(boxes, scores, iou_thr=0.5):
+    """Greedy non-maximum suppression; returns kept indices, best score first"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    order = np.argsort(-np.asarray(scores, dtype=np.float32), kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        ious = iou_matrix(boxes[i], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_thr]
+    return np.array(keep, dtype=np.intp)
+
+
+def weighted_box_fusion(boxes_list, scores_list, weights=None, iou_thr=0.55):
+    """
+    Weighted box fusion across models: overlapping boxes are averaged
+    (weighted by score x model weight) instead of one of them being
+    dropped. A fused box's score is the summed weighted score over the
+    total model weight, so boxes only one model agrees on score lower.
+    Returns (boxes, scores).
+    """
+    n_models = len(boxes_list)
+    weights = np.ones(n_models, dtype=np.float32) if weights is None \
+        else np.asarray(weights, dtype=np.float32)
+    all_boxes = [np.asarray(b, dtype=np.float32).reshape(-1, 4) for b in boxes_list]
+    all_scores = [np.asarray(s, dtype=np.float32).reshape(-1) * w
+                  for s, w in zip(scores_list, weights)]
+    boxes = np.concatenate(all_boxes) if all_boxes else np.zeros((0, 4), np.float32)
+    scores = np.concatenate(all_scores) if all_scores else np.zeros(0, np.float32)
+    if not len(boxes):
+        return boxes, scores
+
+    fused = np.zeros((len(boxes), 4), dtype=np.float32)   # running fused boxes
+    box_sum = np.zeros((len(boxes), 4), dtype=np.float32)  # sum of score * box
+    score_sum = np.zeros(len(boxes), dtype=np.float32)
+    n = 0
+    for i in np.argsort(-scores, kind='stable'):
+        j = -1
+        if n:
+            ious = iou_matrix(boxes[i], fused[:n])[0]
+            best = int(np.argmax(ious))
+            if ious[best] > iou_thr:
+                j = best
+        if j < 0:
+            j = n
+            n += 1
+        box_sum[j] += scores[i] * boxes[i]
+        score_sum[j] += scores[i]
+        fused[j] = box_sum[j] / max(score_sum[j], 1e-9)
+    out_scores = np.minimum(score_sum[:n] / weights.sum(), 1.0)
+    order = np.argsort(-out_scores, kind='stable')
+    return fused[:n][order], out_scores[order]
+
+
+# ── Detection result adapter ─────────────────────────────────────
+
+def extract_boxes(results):
+    """
+    Pull every box of a predict() call out as arrays in one transfer per
+    result: (xyxy float32 (N, 4), conf (N,), cls (N,)).
+    """
+    xyxy, conf, cls = [], [], []
+    for r in results:
+        if r.boxes is None or not len(r.boxes):
+            continue
+        # rows are x1, y1, x2, y2, [track id,] conf, cls
+        data = r.boxes.data.cpu().numpy().astype(np.float32, copy=False)
+        xyxy.append(data[:, :4])
+        conf.append(data[:, -2])
+        cls.append(data[:, -1])
+    if not xyxy:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32)
+    return np.concatenate(xyxy), np.concatenate(conf), np.concatenate(cls)
+
+
+def to_pixels(xyxy, scale=1.0):
+    """Integer pixel boxes, mapped back from an image that was resized by scale"""
+    boxes = np.floor(xyxy)
+    if scale != 1.0:
+        boxes = np.floor(boxes / scale)
+    return boxes.astype(np.int32)
+
+
+def size_mask(boxes, min_w, min_h):
+    """True for boxes at least min_w wide and min_h high"""
+    return ((boxes[:, 2] - boxes[:, 0]) >= min_w) & ((boxes[:, 3] - boxes[:, 1]) >= min_h)
+
+
+def largest_index(boxes):
+    """Index of the box with the biggest area, or None when there are none"""
+    if not len(boxes):
+        return None
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return int(np.argmax(areas))
+
+
+def centers_outside(boxes, rects):
+    """True for boxes whose center lies outside every rect"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2
+    outside = np.ones(len(boxes), dtype=bool)
+    for x1, y1, x2, y2 in rects:
+        outside &= ~((cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2))
+    return outside
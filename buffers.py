@@ -0,0 +1,31 @@
+"""
+Per-session frame buffer pool
+
+Frames of one stream keep the same size, so the arrays the pipeline needs
+for every frame (decode target, redacted output, upscale target, blur
+scratch) are allocated once and reused instead of churning the allocator.
+"""
+
+import numpy as np
+
+
+class FramePool:
+    """Named fixed-shape arrays, reallocated only when the frame size changes"""
+
+    def __init__(self):
+        self._arrays = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        arr = self._arrays.get(name)
+        if arr is None or arr.shape != tuple(shape) or arr.dtype != dtype:
+            arr = np.empty(shape, dtype=dtype)
+            self._arrays[name] = arr
+        return arr
+
+    def scratch(self, name, frame_shape, h, w):
+        """(h, w) view into a frame-sized buffer, for regions of varying size"""
+        return self.get(name, frame_shape)[:h, :w]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self._arrays.values())
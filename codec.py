@@ -0,0 +1,152 @@
+"""
+JPEG codec layer for RTIOC
+
+Uses libjpeg-turbo directly through PyTurboJPEG when it is installed and
+falls back to OpenCV otherwise. Both paths can decode at reduced scale
+(DCT scaling) when the incoming frame is larger than processing needs.
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+except ImportError:
+    TurboJPEG = None
+
+DEFAULT_QUALITY = 60
+
+# OpenCV exposes libjpeg's DCT scaling only as these fixed reductions
+_CV2_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# SOFn markers carry the frame size (C4, C8 and CC are not SOF markers)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(buf):
+    """Read (width, height) from the JPEG header without decoding pixels"""
+    data = memoryview(buf)
+    n = len(data)
+    if n < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 3 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            i += 2
+            continue
+        seg_len = (data[i + 2] << 8) | data[i + 3]
+        if marker in _SOF_MARKERS and i + 8 < n:
+            h = (data[i + 5] << 8) | data[i + 6]
+            w = (data[i + 7] << 8) | data[i + 8]
+            return w, h
+        i += 2 + seg_len
+    return None
+
+
+def pick_scale(w, h, max_side, factors):
+    """Smallest (num, denom) factor that keeps the long side >= max_side"""
+    best = (1, 1)
+    if not max_side:
+        return best
+    long_side = max(w, h)
+    for num, denom in factors:
+        if num > denom:
+            continue
+        scaled = -(-long_side * num // denom)
+        if scaled >= max_side and num * best[1] < best[0] * denom:
+            best = (num, denom)
+    return best
+
+
+class JpegCodec:
+    """Decode/encode JPEG frames with libjpeg-turbo or OpenCV"""
+
+    def __init__(self, use_turbo=True):
+        self.turbo = None
+        if use_turbo and TurboJPEG is not None:
+            try:
+                self.turbo = TurboJPEG()
+            except (OSError, RuntimeError):
+                self.turbo = None
+        if self.turbo is not None:
+            self.factors = sorted(self.turbo.scaling_factors)
+        else:
+            self.factors = [(1, d) for d in _CV2_REDUCED_FLAGS]
+        self._local = threading.local()
+
+    @property
+    def backend(self):
+        return 'turbojpeg' if self.turbo is not None else 'opencv'
+
+    def _buffer(self, shape):
+        """Per-thread decode target, reused while the frame size stays the same"""
+        buf = getattr(self._local, 'frame', None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._local.frame = buf
+        return buf
+
+    def decoded_shape(self, buf, max_side=None):
+        """(h, w, 3) that decode() will return for this JPEG, or None"""
+        size = jpeg_size(buf)
+        if size is None:
+            return None
+        w, h = size
+        num, denom = pick_scale(w, h, max_side, self.factors)
+        return -(-h * num // denom), -(-w * num // denom), 3
+
+    def decode(self, buf, max_side=None, reuse=False, dst=None):
+        """
+        Decode a JPEG to a BGR array, DCT-scaled down when it is bigger than
+        max_side needs. With reuse=True the result lives in a per-thread
+        buffer that is overwritten by the next decode on the same thread;
+        dst (shaped like decoded_shape()) is filled instead when given.
+        The OpenCV backend cannot decode into an existing array.
+        """
+        size = jpeg_size(buf)
+        if size is None:
+            return None
+        w, h = size
+        num, denom = pick_scale(w, h, max_side, self.factors)
+
+        if self.turbo is None:
+            flag = _CV2_REDUCED_FLAGS[denom]
+            return cv2.imdecode(np.frombuffer(buf, dtype=np.uint8), flag)
+
+        out_w = -(-w * num // denom)
+        out_h = -(-h * num // denom)
+        if dst is None and reuse:
+            dst = self._buffer((out_h, out_w, 3))
+        scaling = None if num == denom else (num, denom)
+        try:
+            return self.turbo.decode(buf, pixel_format=TJPF_BGR,
+                                     scaling_factor=scaling, dst=dst)
+        except (OSError, ValueError):
+            return None
+
+    def encode(self, img, quality=DEFAULT_QUALITY):
+        """Encode a BGR array to JPEG bytes"""
+        if self.turbo is not None:
+            return self.turbo.encode(img, quality=quality,
+                                     pixel_format=TJPF_BGR,
+                                     jpeg_subsample=TJSAMP_420)
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buf.tobytes() if ok else None
+
+
+CODEC = JpegCodec()
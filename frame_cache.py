@@ -0,0 +1,119 @@
+"""
+Detection cache for repeated frames
+
+Paused video, static feeds and duplicate archive images keep producing
+the same frame. DetectionCache remembers the detector output (face boxes
+and raw ID boxes) of recent frames in a bounded LRU so a repeat can skip
+the models entirely.
+
+Hash collisions can never hand a frame someone else's boxes: 'exact'
+entries keep the JPEG bytes and compare them in full, 'phash' entries
+keep a small grayscale thumbnail and only match when every thumbnail
+pixel is within CACHE_VERIFY_TOLERANCE. Both also key and compare the
+decoded frame's shape, since the boxes are in that frame's pixels.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+THUMB_SIZE = (32, 24)
+CACHE_VERIFY_TOLERANCE = 6   # max gray level difference per thumbnail pixel (phash)
+ENTRY_OVERHEAD = 256         # rough bytes per entry on top of its arrays
+
+
+def dhash(frame):
+    """64-bit difference hash of a BGR frame"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def thumbnail(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+
+class DetectionCache:
+    """Bounded (entries and bytes) LRU from frame hash to (faces, raw_ids)"""
+
+    def __init__(self, mode='exact', max_entries=1024, max_bytes=32 * 1024 * 1024):
+        if mode not in ('exact', 'phash'):
+            raise ValueError(f"unknown cache mode {mode!r}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (check, faces, raw_ids, nbytes)
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, frame, jpeg):
+        """(key, (shape, check)) for this frame, or (None, None) if it can't be keyed"""
+        shape = frame.shape
+        if self.mode == 'exact':
+            if jpeg is None:
+                return None, None
+            return (shape, hashlib.blake2b(jpeg, digest_size=16).digest()), (shape, bytes(jpeg))
+        return (shape, dhash(frame)), (shape, thumbnail(frame))
+
+    def _matches(self, stored, check):
+        # the same scene at another resolution has its boxes elsewhere
+        if stored[0] != check[0]:
+            return False
+        if self.mode == 'exact':
+            return stored[1] == check[1]
+        diff = cv2.absdiff(stored[1], check[1])
+        return int(diff.max()) <= CACHE_VERIFY_TOLERANCE
+
+    def lookup(self, frame, jpeg=None):
+        """(faces, raw_ids) of an identical earlier frame, else None"""
+        key, check = self._key(frame, jpeg)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._matches(entry[0], check):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+        return None
+
+    def store(self, frame, faces, raw_ids, jpeg=None):
+        key, check = self._key(frame, jpeg)
+        if key is None:
+            return
+        faces = np.array(faces, dtype=np.int32).reshape(-1, 4)
+        raw_ids = np.array(raw_ids, dtype=np.int32).reshape(-1, 4)
+        size = len(check[1]) if self.mode == 'exact' else check[1].nbytes
+        size += faces.nbytes + raw_ids.nbytes + ENTRY_OVERHEAD
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[3]
+            self._entries[key] = (check, faces, raw_ids, size)
+            self.nbytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self.nbytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted[3]
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'mode': self.mode,
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
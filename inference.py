@@ -0,0 +1,87 @@
+"""
+Inference helpers for RTIOC
+
+Rectangular inference keeps the frame's aspect ratio (padded only up to
+the model stride). ultralytics already does that for .pt weights; static
+exports (ONNX, OpenVINO, TensorRT...) are fixed to a square unless they
+are exported at the frame's shape, so they are exported once per shape
+and cached on disk.
+FrameDeadline tracks a per-frame latency budget.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+STRIDE = 32
+EXPORT_CACHE_DIR = 'models/cache'
+
+
+def rect_imgsz(shape, long_side, stride=STRIDE):
+    """(h, w) inference size for a frame of this shape, long side = long_side"""
+    h, w = shape[:2]
+    r = long_side / max(h, w)
+    return (-(-round(h * r) // stride) * stride,
+            -(-round(w * r) // stride) * stride)
+
+
+def square_padding(shape, long_side):
+    """Fraction of a square long_side x long_side input (a static export's) that is padding"""
+    h, w = shape[:2]
+    r = long_side / max(h, w)
+    return 1.0 - (h * r) * (w * r) / (long_side * long_side)
+
+
+class RectExportCache:
+    """One static export per (weights, shape), loaded lazily and kept in memory"""
+
+    def __init__(self, export_format, cache_dir=EXPORT_CACHE_DIR):
+        self.export_format = export_format
+        self.cache_dir = cache_dir
+        self.models = {}
+        self._lock = threading.Lock()
+
+    def _artifact(self, path, imgsz):
+        """Cached export for this weights file and shape, exporting it if needed"""
+        from ultralytics import YOLO
+
+        h, w = imgsz
+        stem = os.path.splitext(os.path.basename(path))[0]
+        shape_dir = os.path.join(self.cache_dir, f"{h}x{w}", self.export_format)
+        if os.path.isdir(shape_dir):
+            for entry in sorted(os.listdir(shape_dir)):
+                if entry.startswith(stem + '.') or entry.startswith(stem + '_'):
+                    return os.path.join(shape_dir, entry)
+
+        print(f"Exporting {path} to {self.export_format} at {w}x{h}...")
+        exported = YOLO(path).export(format=self.export_format, imgsz=list(imgsz))
+        os.makedirs(shape_dir, exist_ok=True)
+        target = os.path.join(shape_dir, os.path.basename(str(exported).rstrip('/\\')))
+        shutil.move(str(exported), target)
+        return target
+
+    def get(self, path, imgsz):
+        key = (path, tuple(imgsz))
+        with self._lock:
+            model = self.models.get(key)
+            if model is None:
+                from ultralytics import YOLO
+                model = YOLO(self._artifact(path, imgsz), task='detect')
+                self.models[key] = model
+        return model
+
+
+class FrameDeadline:
+    """Latency budget of one frame, measured from when the frame arrived"""
+
+    def __init__(self, budget_ms, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.budget = budget_ms / 1000.0
+
+    def used(self):
+        """Fraction of the budget spent so far (> 1 once the deadline is missed)"""
+        return (time.perf_counter() - self.start) / self.budget
+
+    def missed(self):
+        return self.used() >= 1.0
@@ -0,0 +1,311 @@
+"""
+RTIOC - Server-side camera ingest
+
+Pulls frames straight from local cameras (V4L2 index), RTSP/HTTP streams
+or video files, without a browser in the loop. Each source gets its own
+lightweight capture thread that only keeps the newest frame; one shared
+inference thread feeds those frames through run_detection and hands the
+redacted result to the sinks.
+
+Usage:
+    python ingest.py --source desk=0 --source lobby=rtsp://10.0.0.5/stream \\
+                     --sink-dir redacted/ --serve
+    python ingest.py --source test=clip.mp4 --loop --sink-dir out/   # file as camera
+"""
+
+import argparse
+import functools
+import os
+import threading
+import time
+
+import cv2
+
+from codec import CODEC
+from stream import HUB
+
+RECONNECT_DELAY = 2.0   # seconds between reopen attempts of a dropped live source
+MJPEG_QUALITY   = 70
+SINK_FPS        = 15.0  # file sink rate for sources that report no usable FPS
+SINK_MAX_FPS    = 120.0 # reported rates above this (some drivers say 1000) are ignored
+
+
+def parse_source(spec):
+    """'name=uri' -> (name, uri); digit URIs are V4L2/webcam indices"""
+    name, sep, uri = spec.partition('=')
+    if not sep or ':' in name or '/' in name:
+        uri = spec
+        name = f"cam{spec}" if spec.isdigit() else os.path.splitext(os.path.basename(spec))[0]
+    return name, int(uri) if uri.isdigit() else uri
+
+
+class CaptureSource(threading.Thread):
+    """
+    Reads one source as fast as it produces frames and keeps only the
+    latest one, so a slow consumer never sees buffered (stale) video.
+    Video files are paced at their native FPS to behave like a camera.
+    """
+
+    def __init__(self, name, uri, loop=False):
+        super().__init__(name=f"capture-{name}", daemon=True)
+        self.source_name = name
+        self.uri = uri
+        self.loop = loop
+        self.is_file = isinstance(uri, str) and os.path.isfile(uri)
+        self.fps = 0.0
+        self.frames_read = 0
+        self.finished = False
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._halt = threading.Event()
+        self.on_frame = None   # set by the scheduler to get woken up
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.uri)
+        if not cap.isOpened():
+            return None
+        # Live sources: keep the driver queue as short as possible
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        return cap
+
+    def run(self):
+        cap = None
+        interval = 0.0
+        next_t = time.perf_counter()
+        while not self._halt.is_set():
+            if cap is None:
+                cap = self._open()
+                if cap is None:
+                    if self.is_file:
+                        print(f"❌ ERROR: could not open {self.uri}")
+                        break
+                    self._halt.wait(RECONNECT_DELAY)
+                    continue
+                interval = 1.0 / self.fps if self.is_file and self.fps > 0 else 0.0
+                next_t = time.perf_counter()
+
+            ok, frame = cap.read()
+            if not ok:
+                if self.is_file and self.loop:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                cap.release()
+                cap = None
+                if self.is_file:
+                    break
+                continue
+
+            with self._lock:
+                self._frame = frame
+                self._seq += 1
+            self.frames_read += 1
+            if self.on_frame is not None:
+                self.on_frame()
+
+            if interval:
+                next_t += interval
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    self._halt.wait(delay)
+                else:
+                    next_t = time.perf_counter()
+
+        if cap is not None:
+            cap.release()
+        self.finished = True
+        if self.on_frame is not None:
+            self.on_frame()
+
+    def latest(self):
+        """(seq, frame) of the newest frame; seq is 0 until the first read"""
+        with self._lock:
+            return self._seq, self._frame
+
+    def stop(self):
+        self._halt.set()
+
+
+class InferenceScheduler(threading.Thread):
+    """
+    Single inference thread shared by all sources. Visits the sources
+    round-robin and processes only the newest frame of each; frames that
+    arrived in between are counted as skipped, never queued.
+    With fair (a scheduler.FairScheduler, shared with browser sessions on
+    --serve) each frame waits for a slot as session camera:<source>.
+    """
+
+    def __init__(self, sources, detect, new_session, sinks, fair=None):
+        super().__init__(name="inference", daemon=True)
+        self.sources = sources
+        self.detect = detect
+        self.sinks = sinks
+        self.fair = fair
+        self.sessions = {s.source_name: new_session() for s in sources}
+        self.last_seq = {s.source_name: 0 for s in sources}
+        self.stats = {s.source_name: {'processed': 0, 'skipped': 0, 'latency_ms': 0.0}
+                      for s in sources}
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        for s in sources:
+            s.on_frame = self._wake.set
+
+    def run(self):
+        while not self._halt.is_set():
+            self._wake.clear()
+            did_work = False
+            for src in self.sources:
+                name = src.source_name
+                seq, frame = src.latest()
+                if seq <= self.last_seq[name]:
+                    continue
+                st = self.stats[name]
+                st['skipped'] += seq - self.last_seq[name] - 1
+                self.last_seq[name] = seq
+
+                t0 = time.perf_counter()
+                if self.fair is not None:
+                    with self.fair.slot('camera:' + name, 'live'):
+                        output, faces, ids, _, _ = self.detect(frame, session=self.sessions[name])
+                else:
+                    output, faces, ids, _, _ = self.detect(frame, session=self.sessions[name])
+                st['latency_ms'] = (time.perf_counter() - t0) * 1000
+                st['processed'] += 1
+                for sink in self.sinks:
+                    sink.write(name, output)
+                did_work = True
+            if not did_work:
+                if all(s.finished for s in self.sources):
+                    break
+                self._wake.wait(0.1)
+        for sink in self.sinks:
+            sink.close()
+
+    def stop(self):
+        self._halt.set()
+        self._wake.set()
+
+
+# ── Sinks ────────────────────────────────────────────────────────
+
+class FileSink:
+    """
+    Writes each source's redacted frames to <dir>/<source>.mp4 at the
+    source's own frame rate (SINK_FPS if it reports none). Frames are placed
+    by the time they arrive: frames the inference thread skipped are filled
+    with the previous one and extra frames are dropped, so the video plays
+    at real speed.
+    """
+
+    def __init__(self, directory, sources=()):
+        self.directory = directory
+        self.sources = {s.source_name: s for s in sources}
+        self.writers = {}   # name -> [writer, fps, start time, frames written, last frame]
+        os.makedirs(directory, exist_ok=True)
+
+    def source_fps(self, name):
+        src = self.sources.get(name)
+        fps = src.fps if src is not None else 0.0
+        return fps if 0 < fps <= SINK_MAX_FPS else SINK_FPS
+
+    def write(self, name, frame):
+        now = time.perf_counter()
+        entry = self.writers.get(name)
+        if entry is None:
+            h, w = frame.shape[:2]
+            fps = self.source_fps(name)
+            path = os.path.join(self.directory, f"{name}.mp4")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            entry = self.writers[name] = [writer, fps, now, 0, None]
+        writer, fps, start, written, last = entry
+        due = int((now - start) * fps) + 1   # frame slots up to and including now
+        if due <= written:
+            return   # the source runs ahead of its FPS
+        for _ in range(due - written - 1):
+            writer.write(last)   # slots the inference thread missed show the previous frame
+        writer.write(frame)
+        # kept as a copy: frame is the session's pooled output, overwritten next time
+        if last is None or last.shape != frame.shape:
+            last = frame.copy()
+        else:
+            last[...] = frame
+        entry[3:] = [due, last]
+
+    def close(self):
+        for writer, _, _, _, _ in self.writers.values():
+            writer.release()
+        self.writers.clear()
+
+
+class StreamSink:
+    """Publishes each source's redacted frames to /stream/<source>.mjpg"""
+
+    def __init__(self, hub, quality=MJPEG_QUALITY):
+        self.hub = hub
+        self.quality = quality
+
+    def write(self, name, frame):
+        # Encode only while someone is watching; all viewers share the bytes
+        if self.hub.has_viewers(name):
+            self.hub.publish(name, CODEC.encode(frame, self.quality))
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC server-side camera ingest")
+    parser.add_argument('--source', action='append', required=True,
+                        help="name=uri (V4L2 index, rtsp:// URL or video file); repeatable")
+    parser.add_argument('--loop', action='store_true', help="loop video file sources")
+    parser.add_argument('--sink-dir', help="write redacted video per source to this folder")
+    parser.add_argument('--serve', action='store_true', help="serve /stream/<source>.mjpg")
+    parser.add_argument('--motion-gate', action='store_true',
+                        help="only re-detect regions that changed (static cameras)")
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    import app_final3 as rtioc
+
+    sources = [CaptureSource(*parse_source(spec), loop=args.loop) for spec in args.source]
+    sinks = []
+    if args.sink_dir:
+        sinks.append(FileSink(args.sink_dir, sources))
+    if args.serve:
+        sinks.append(StreamSink(HUB))
+    if not sinks:
+        parser.error("need at least one of --sink-dir / --serve")
+
+    new_session = functools.partial(rtioc.new_session, motion=args.motion_gate)
+    scheduler = InferenceScheduler(sources, rtioc.run_detection, new_session, sinks,
+                                   fair=rtioc.scheduler if args.serve else None)
+    for src in sources:
+        src.start()
+    scheduler.start()
+    print(f"✅ Ingesting {len(sources)} source(s): " + ", ".join(s.source_name for s in sources))
+
+    try:
+        if args.serve:
+            print(f"➡️  Streams: http://localhost:{args.port}/stream/<source>.mjpg")
+            rtioc.app.run(host='0.0.0.0', port=args.port, debug=False, threaded=True)
+        else:
+            while scheduler.is_alive():
+                scheduler.join(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for src in sources:
+            src.stop()
+        scheduler.stop()
+        scheduler.join(5.0)
+        for name, st in scheduler.stats.items():
+            print(f"  {name}: {st['processed']} processed, {st['skipped']} skipped, "
+                  f"last {st['latency_ms']:.0f} ms")
+            gate = scheduler.sessions[name]['motion']
+            if gate is not None:
+                print(f"    motion gate: {gate.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""
+RTIOC load test — many webcam clients against one server
+
+Each simulated client replays a local video clip (or generated frames)
+to /process_frame under its own session id, the way the browser page does.
+
+    closed  every client waits for its response before sending the next
+            frame (what the page's processing loop does)
+    open    every client sends at --rate fps whether or not the server keeps
+            up, with at most --max-in-flight requests outstanding; frames
+            beyond that are dropped, and latency counts from the scheduled
+            send time so queueing shows up in p99
+
+Per concurrency level it reports throughput, p50/p99 latency, error and
+skip rates (responses whose 'skipped' list is non-empty), how many frames
+the server throttled (over its per-session fps cap — not errors) and the
+server's peak RSS from /stats.
+
+Usage:
+    python loadtest.py --spawn --clients 1,4,16 [--video clip.mp4]
+    python loadtest.py --url http://127.0.0.1:5000 --mode open --rate 10
+--spawn starts app_final3.py with stub models (RTIOC_STUB_MODELS=1), so no
+weights or GPU are needed; the stub latency is set with --stub-latency-ms.
+Clips loop and every client sends the same frames, so the spawned server
+runs with its repeated-frame cache off (RTIOC_FRAME_CACHE=off) unless
+--frame-cache is given; start a --url server the same way to measure inference.
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import cv2
+
+from benchmark import make_test_frame
+
+
+def load_clip(path, max_frames, width, quality):
+    """Frames of a clip as JPEG data URLs, resized like the browser's canvas"""
+    frames = []
+    if path:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise SystemExit(f"❌ ERROR: could not read frames from {path}")
+    else:
+        base = make_test_frame(width * 2, width * 3 // 2)
+        for i in range(max_frames):
+            # pan across a larger frame so consecutive frames differ
+            x = (i * 4) % width
+            frames.append(base[:width * 3 // 4, x:x + width])
+
+    urls = []
+    for frame in frames:
+        h, w = frame.shape[:2]
+        if w != width:
+            frame = cv2.resize(frame, (width, round(h * width / w)), interpolation=cv2.INTER_AREA)
+        _, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        urls.append('data:image/jpeg;base64,' + base64.b64encode(buf).decode('ascii'))
+    return urls
+
+
+class Server:
+    """host/port of the server under test, plus JSON helpers"""
+
+    def __init__(self, url, timeout=30.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 80
+        self.timeout = timeout
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get_json(self, path):
+        conn = self.connect()
+        try:
+            conn.request('GET', path)
+            return json.loads(conn.getresponse().read())
+        finally:
+            conn.close()
+
+
+class Results:
+    """Outcome of every request at one concurrency level (thread-safe)"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.skipped = 0
+        self.throttled = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, status, skipped):
+        with self._lock:
+            if status == 'throttled':
+                self.throttled += 1
+            elif status == 'ok':
+                self.latencies.append(latency_ms)
+                self.skipped += bool(skipped)
+            else:
+                self.errors += 1
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+
+def post_frame(conn, frame_url, sid):
+    """One /process_frame call: (status, skipped). Raises on connection errors."""
+    body = json.dumps({'frame': frame_url, 'session': sid})
+    conn.request('POST', '/process_frame', body=body,
+                 headers={'Content-Type': 'application/json'})
+    resp = conn.getresponse()
+    payload = resp.read()
+    if resp.status != 200:
+        return 'error', False
+    data = json.loads(payload)
+    return data.get('status'), bool(data.get('skipped'))
+
+
+class Client:
+    """One simulated webcam: own session id, own connection, own place in the clip"""
+
+    def __init__(self, server, frames, offset):
+        self.server = server
+        self.frames = frames
+        self.index = offset
+        self.sid = uuid.uuid4().hex
+        self._local = threading.local()
+
+    def next_frame(self):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return frame
+
+    def send(self, frame_url, results, start):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.server.connect()
+        try:
+            status, skipped = post_frame(conn, frame_url, self.sid)
+        except (OSError, http.client.HTTPException, ValueError):
+            conn.close()
+            self._local.conn = None
+            status, skipped = 'error', False
+        results.record((time.perf_counter() - start) * 1000, status, skipped)
+
+
+def run_closed(clients, duration, results):
+    stop_at = time.perf_counter() + duration
+
+    def loop(client):
+        while time.perf_counter() < stop_at:
+            client.send(client.next_frame(), results, time.perf_counter())
+
+    threads = [threading.Thread(target=loop, args=(c,), daemon=True) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_open(clients, duration, results, rate, max_in_flight):
+    interval = 1.0 / rate
+    in_flight = {c.sid: 0 for c in clients}
+    lock = threading.Lock()
+
+    def send(client, frame_url, scheduled):
+        try:
+            client.send(frame_url, results, scheduled)
+        finally:
+            with lock:
+                in_flight[client.sid] -= 1
+
+    with ThreadPoolExecutor(max_workers=len(clients) * max_in_flight) as pool:
+        start = time.perf_counter()
+        n = int(duration * rate)
+        for tick in range(n):
+            scheduled = start + tick * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            for client in clients:
+                frame_url = client.next_frame()
+                with lock:
+                    if in_flight[client.sid] >= max_in_flight:
+                        results.drop()
+                        continue
+                    in_flight[client.sid] += 1
+                pool.submit(send, client, frame_url, scheduled)
+
+
+def sample_rss(server, stop, peak):
+    """Poll /stats until stop is set, keeping the highest RSS seen"""
+    while not stop.is_set():
+        try:
+            rss = (server.get_json('/stats').get('memory') or {}).get('rss')
+            if rss:
+                peak[0] = max(peak[0], rss)
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+        stop.wait(0.5)
+
+
+def run_level(server, frames, n_clients, args):
+    clients = [Client(server, frames, i * len(frames) // n_clients) for i in range(n_clients)]
+    results = Results()
+    peak = [0]
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_rss, args=(server, stop, peak), daemon=True)
+    sampler.start()
+
+    t0 = time.perf_counter()
+    if args.mode == 'closed':
+        run_closed(clients, args.duration, results)
+    else:
+        run_open(clients, args.duration, results, args.rate, args.max_in_flight)
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    sampler.join()
+    return results, elapsed, peak[0]
+
+
+def print_row(n_clients, results, elapsed, rss):
+    done = len(results.latencies)
+    total = done + results.errors + results.throttled
+    lat = sorted(results.latencies) or [0.0]
+    p50 = statistics.median(lat)
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    err = results.errors / total * 100 if total else 0.0
+    skip = results.skipped / done * 100 if done else 0.0
+    throttled = results.throttled / total * 100 if total else 0.0
+    rss_mb = f"{rss / 1e6:8.1f}" if rss else "     n/a"
+    print(f"  {n_clients:>7}  {done / elapsed:8.1f}  {p50:8.1f}  {p99:8.1f}"
+          f"  {err:6.1f}%  {skip:6.1f}%  {throttled:8.1f}%  {results.dropped:>7}  {rss_mb}")
+
+
+def spawn_server(port, stub_latency_ms, frame_cache=False):
+    env = dict(os.environ, RTIOC_STUB_MODELS='1', RTIOC_PORT=str(port),
+               RTIOC_STUB_LATENCY_MS=str(stub_latency_ms))
+    if not frame_cache:
+        env['RTIOC_FRAME_CACHE'] = 'off'
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, os.path.join(here, 'app_final3.py')],
+                            cwd=here, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc
+
+
+def wait_ready(server, proc=None, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit("❌ ERROR: server exited during startup")
+        try:
+            server.get_json('/stats')
+            return
+        except (OSError, http.client.HTTPException, ValueError):
+            time.sleep(0.5)
+    raise SystemExit(f"❌ ERROR: server at {server.host}:{server.port} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC multi-client load test")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--spawn', action='store_true',
+                        help="start app_final3.py with stub models on the --url port")
+    parser.add_argument('--stub-latency-ms', type=float, default=20.0)
+    parser.add_argument('--frame-cache', action='store_true',
+                        help="keep the spawned server's repeated-frame cache on")
+    parser.add_argument('--video', help="clip to replay (default: generated frames)")
+    parser.add_argument('--max-frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=320, help="frame width sent by clients")
+    parser.add_argument('--quality', type=int, default=70, help="client JPEG quality")
+    parser.add_argument('--clients', default='1,2,4,8,16',
+                        help="comma-separated concurrency levels")
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed')
+    parser.add_argument('--rate', type=float, default=10.0, help="fps per client (open loop)")
+    parser.add_argument('--max-in-flight', type=int, default=4,
+                        help="outstanding requests per client (open loop)")
+    parser.add_argument('--duration', type=float, default=15.0, help="seconds per level")
+    args = parser.parse_args()
+
+    server = Server(args.url)
+    frames = load_clip(args.video, args.max_frames, args.width, args.quality)
+    proc = spawn_server(server.port, args.stub_latency_ms, args.frame_cache) if args.spawn else None
+    try:
+        wait_ready(server, proc)
+        print(f"🔁 {len(frames)} frames, {args.mode} loop, {args.duration:.0f}s per level"
+              + (f", {args.rate:g} fps per client" if args.mode == 'open' else ""))
+        print(f"  {'clients':>7}  {'fps':>8}  {'p50 ms':>8}  {'p99 ms':>8}"
+              f"  {'errors':>7}  {'skipped':>7}  {'throttled':>9}  {'dropped':>7}  {'RSS MB':>8}")
+        for n in (int(v) for v in args.clients.split(',')):
+            results, elapsed, rss = run_level(server, frames, n, args)
+            print_row(n, results, elapsed, rss)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Process memory readings for RTIOC
+
+Linux-only (/proc); elsewhere the readings fall back to the peak RSS from
+resource.getrusage, or None.
+"""
+
+import os
+
+
+def rss_bytes(pid='self'):
+    """Current resident set size of a process in bytes"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == 'self' or pid == os.getpid():
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if os.uname().sysname == 'Darwin' else peak * 1024
+        except (ImportError, AttributeError):
+            pass
+    return None
+
+
+def memory_info(pid='self'):
+    """
+    rss, pss, shared and private bytes of a process. PSS splits each shared
+    page between the processes mapping it, so for forked workers sharing
+    model weights the sum of their PSS is the real footprint. pss/shared/
+    private need /proc/<pid>/smaps_rollup (Linux 4.14+) and are None without it.
+    """
+    info = {'rss': rss_bytes(pid), 'pss': None, 'shared': None, 'private': None}
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':'):
+                    fields[parts[0][:-1]] = int(parts[1]) * 1024
+    except (OSError, ValueError):
+        return info
+    info['pss'] = fields.get('Pss')
+    info['shared'] = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    info['private'] = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return info
@@ -0,0 +1,120 @@
+"""
+Motion gating for mostly static camera views
+
+A downsampled grayscale difference against the last detected frame
+decides, per frame, whether the detectors need to run at all and, if
+so, on which tiles. Unchanged tiles keep their previous boxes.
+"""
+
+import cv2
+import numpy as np
+
+MOTION_WIDTH      = 96     # width of the downsampled difference image
+MOTION_THRESHOLD  = 20     # per-pixel gray level change that counts as motion
+MOTION_MIN_AREA   = 6      # components smaller than this (downsampled px) are noise
+MOTION_TILES      = (4, 3) # tile grid (columns, rows) regions are snapped to
+MOTION_MAX_TILES  = 0.5    # above this share of changed tiles, re-detect the whole frame
+MOTION_FULL_EVERY = 15     # full re-detect at least this often (frames)
+
+
+class MotionGate:
+    """
+    Per-stream motion analysis. analyse() returns one of
+        ('full', None)      run the detectors on the whole frame
+        ('none', None)      nothing moved — reuse the previous boxes
+        ('regions', rects)  re-detect only these (x1, y1, x2, y2) rects
+    The reference image is only refreshed where detection actually runs,
+    so slow drift below the threshold still triggers eventually.
+    """
+
+    def __init__(self):
+        self.reference = None
+        self.since_full = 0
+        self.stats = {'full': 0, 'none': 0, 'regions': 0}
+
+    def _small(self, frame):
+        h, w = frame.shape[:2]
+        sw = min(MOTION_WIDTH, w)
+        sh = max(1, round(h * sw / w))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (sw, sh), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def analyse(self, frame):
+        small = self._small(frame)
+        self.since_full += 1
+        if (self.reference is None or self.reference.shape != small.shape
+                or self.since_full >= MOTION_FULL_EVERY):
+            return self._decide('full', small)
+
+        diff = cv2.absdiff(small, self.reference)
+        _, mask = cv2.threshold(diff, MOTION_THRESHOLD, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=1)
+        n, _, comp, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+        sh, sw = small.shape
+        cols, rows = MOTION_TILES
+        changed = np.zeros((rows, cols), dtype=bool)
+        for x, y, cw, ch, area in comp[1:n]:
+            if area < MOTION_MIN_AREA:
+                continue
+            c1, c2 = x * cols // sw, (x + cw - 1) * cols // sw
+            r1, r2 = y * rows // sh, (y + ch - 1) * rows // sh
+            changed[r1:r2 + 1, c1:c2 + 1] = True
+
+        if not changed.any():
+            return self._decide('none', small)
+        if changed.mean() > MOTION_MAX_TILES:
+            return self._decide('full', small)
+        return self._decide('regions', small, changed, frame.shape)
+
+    def _decide(self, decision, small, changed=None, frame_shape=None):
+        self.stats[decision] += 1
+        if decision == 'full':
+            self.reference = small
+            self.since_full = 0
+            return decision, None
+        if decision == 'none':
+            return decision, None
+
+        h, w = frame_shape[:2]
+        sh, sw = small.shape
+        cols, rows = MOTION_TILES
+        rects = []
+        for r, c1, c2 in tile_runs(changed):
+            y1, y2 = r * h // rows, (r + 1) * h // rows
+            x1, x2 = c1 * w // cols, (c2 + 1) * w // cols
+            rects.append((x1, y1, x2, y2))
+            # these tiles get re-detected, so they become the new reference
+            sy1, sy2 = r * sh // rows, (r + 1) * sh // rows
+            sx1, sx2 = c1 * sw // cols, (c2 + 1) * sw // cols
+            self.reference[sy1:sy2, sx1:sx2] = small[sy1:sy2, sx1:sx2]
+        return decision, merge_rows(rects)
+
+
+def tile_runs(changed):
+    """Horizontal runs of changed tiles: (row, first col, last col)"""
+    runs = []
+    for r, row in enumerate(changed):
+        c = 0
+        while c < len(row):
+            if row[c]:
+                start = c
+                while c + 1 < len(row) and row[c + 1]:
+                    c += 1
+                runs.append((r, start, c))
+            c += 1
+    return runs
+
+
+def merge_rows(rects):
+    """Stack runs covering the same columns in consecutive rows into one rect"""
+    merged = []
+    for x1, y1, x2, y2 in rects:
+        for i, (mx1, my1, mx2, my2) in enumerate(merged):
+            if mx1 == x1 and mx2 == x2 and my2 == y1:
+                merged[i] = (mx1, my1, mx2, y2)
+                break
+        else:
+            merged.append((x1, y1, x2, y2))
+    return merged
@@ -0,0 +1,231 @@
+"""
+Preload-then-fork serving: several RTIOC workers sharing one copy of the weights
+
+The parent imports app_final3 (loading every model), runs one warm-up
+inference and freezes the garbage collector before forking. Workers then
+map the parent's weight pages copy-on-write instead of each loading its
+own models, so N workers cost roughly one set of weights plus N sets of
+activations. The warm-up has to happen before the fork: the first
+predict() fuses conv+batchnorm layers into new tensors, which each worker
+would otherwise allocate for itself. It runs single-threaded: the Linux
+torch wheels use GNU OpenMP, which is not fork-safe, and a child whose
+parent had started a thread pool can hang in its first parallel region
+(the gunicorn --preload + torch deadlock). After warm-up every worker is
+sent one real frame to prove it serves.
+
+Sessions live in the worker that served them, so the parent routes by
+session id (router.py) exactly as it would across separate nodes.
+
+    python prefork.py --workers 4 [--port 5000] [--report-every 30]
+
+The parent prints each worker's RSS, PSS, shared and private memory after
+warm-up and every --report-every seconds; sum(PSS) is the real footprint,
+and a worker whose private memory keeps growing has stopped sharing.
+On a GPU the weights are moved to the device per worker, so only the
+host-side copy is shared.
+"""
+
+import argparse
+import base64
+import gc
+import http.client
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+from memstats import memory_info
+from router import Router, RouterHandler
+from tuning import TUNING_PATH, load_tuning
+
+WARMUP_SIZE   = (640, 480)   # warm-up frame, same shape the page usually sends
+CHECK_TIMEOUT = 120          # seconds a new worker gets to warm up and serve a frame
+
+
+def warm_up_frame():
+    w, h = WARMUP_SIZE
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def warm_up(rtioc):
+    """Load the default models and run one inference so lazy model setup happens now"""
+    rtioc.model_registry.preload(['face', 'id', 'id2', 'unified'])
+    rtioc.run_detection(warm_up_frame(), annotate=False,
+                        session=rtioc.new_session(pooled=False))
+
+
+def warm_up_before_fork(rtioc):
+    """warm_up without starting any thread pool the children would inherit broken"""
+    import cv2
+    import torch
+
+    torch.set_num_threads(1)
+    cv2.setNumThreads(1)
+    warm_up(rtioc)
+
+
+def serve_worker(rtioc, port, threads):
+    """Child process: pin its thread count, warm up and serve until killed"""
+    import cv2
+    import torch
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # the parent handles Ctrl+C
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(rtioc.TUNING.get('cv2_threads', -1))   # -1: OpenCV's default
+    warm_up(rtioc)
+    server = make_server('127.0.0.1', port, rtioc.app, threaded=True)
+    server.serve_forever()
+
+
+def fork_workers(rtioc, count, base_port):
+    # split the cores between workers unless autotune.py measured a better count
+    threads = rtioc.TUNING.get('torch_threads') or max(1, (os.cpu_count() or 1) // count)
+    workers = {}
+    for i in range(count):
+        port = base_port + i
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve_worker(rtioc, port, threads)
+            except BaseException as e:
+                print(f"❌ ERROR: worker on port {port}: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = port
+    return workers
+
+
+def mb(value):
+    return f"{value / 1e6:9.1f}" if value is not None else "      n/a"
+
+
+def report(workers):
+    print(f"  {'pid':>7}  {'port':>5}  {'RSS MB':>9}  {'PSS MB':>9}  {'shared MB':>9}  {'private MB':>10}")
+    total_rss = total_pss = 0
+    rows = [(os.getpid(), 'parent')] + sorted(workers.items())
+    for pid, port in rows:
+        info = memory_info(pid)
+        if info['rss'] is None:
+            print(f"  {pid:>7}  {port:>5}  (exited)")
+            continue
+        total_rss += info['rss']
+        total_pss += info['pss'] or 0
+        print(f"  {pid:>7}  {port:>5}  {mb(info['rss'])}  {mb(info['pss'])}"
+              f"  {mb(info['shared'])}  {mb(info['private']):>10}")
+    print(f"  {'total':>14}  {mb(total_rss)}  {mb(total_pss or None)}")
+
+
+def check_workers(rtioc, workers):
+    """Send every worker one frame; True if all of them answered it"""
+    body = json.dumps({'frame': 'data:image/jpeg;base64,' + base64.b64encode(
+        rtioc.CODEC.encode(warm_up_frame(), 70)).decode('ascii'), 'session': 'prefork-check'})
+    ok = True
+    for pid, port in sorted(workers.items()):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=CHECK_TIMEOUT)
+        try:
+            conn.request('POST', '/process_frame', body=body,
+                         headers={'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            status = json.loads(resp.read()).get('status') if resp.status == 200 else resp.status
+        except (OSError, ValueError) as e:
+            status = e
+        finally:
+            conn.close()
+        if status != 'ok':
+            print(f"❌ ERROR: worker {pid} on port {port} did not serve a frame: {status}")
+            ok = False
+    if ok:
+        print(f"✅ All {len(workers)} workers served a frame")
+    return ok
+
+
+def report_loop(workers, every, halt):
+    while not halt.wait(every):
+        report(workers)
+
+
+def stop_workers(workers):
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC preforked workers with shared weights")
+    tuned = load_tuning(os.environ.get('RTIOC_TUNING', TUNING_PATH))
+    parser.add_argument('--workers', type=int, default=tuned.get('workers', 2),
+                        help="default: the autotune.py result, else 2")
+    parser.add_argument('--port', type=int, default=5000, help="public port (session router)")
+    parser.add_argument('--base-port', type=int, default=5001, help="port of the first worker")
+    parser.add_argument('--report-every', type=float, default=30.0,
+                        help="seconds between memory reports (0 = only after warm-up)")
+    args = parser.parse_args()
+    if not hasattr(os, 'fork'):
+        raise SystemExit("❌ ERROR: preforking needs os.fork (Linux/macOS)")
+
+    import app_final3 as rtioc
+
+    if rtioc.DEVICE == 'cpu':
+        warm_up_before_fork(rtioc)
+    else:
+        # CUDA can't be initialised before fork; each worker warms up on its own
+        print("⚠️  GPU host: only the host copy of the weights is shared between workers")
+    # Objects that exist now are never collected: keeps the GC from writing to
+    # (and so un-sharing) the pages of every model object it would traverse
+    gc.collect()
+    gc.freeze()
+
+    workers = fork_workers(rtioc, args.workers, args.base_port)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    router = Router([f"http://127.0.0.1:{port}" for port in workers.values()])
+    router.start()
+    RouterHandler.router = router
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), RouterHandler)
+    server.daemon_threads = True
+    print(f"🔀 {args.workers} workers behind http://localhost:{args.port}")
+
+    halt = threading.Event()
+
+    def first_report():
+        # wait for the workers' own warm-up before the first reading
+        deadline = time.time() + CHECK_TIMEOUT
+        while router.healthy_count() < len(workers) and time.time() < deadline:
+            time.sleep(0.5)
+        check_workers(rtioc, workers)
+        print("📊 Memory after warm-up:")
+        report(workers)
+        if args.report_every > 0:
+            report_loop(workers, args.report_every, halt)
+
+    threading.Thread(target=first_report, daemon=True).start()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        halt.set()
+        router.stop()
+        server.server_close()
+        stop_workers(workers)
+
+
+if __name__ == '__main__':
+    main()
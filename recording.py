@@ -0,0 +1,71 @@
+"""
+Frame recordings for RTIOC
+
+An append-only file of the frames a server accepted (stale and throttled
+uploads are left out, as they never reach the tracker), so a production
+frame sequence can be replayed later (replay.py). After a short header,
+each record is
+
+    arrival time (float64, seconds since the epoch)
+    session id length (uint16), JPEG length (uint32)
+    session id (utf-8), JPEG bytes as uploaded
+
+The JPEGs are stored exactly as the client sent them, so nothing is
+re-encoded and the file is no bigger than the uploads themselves. A
+record with no JPEG is a heartbeat (a delta-gated client's "unchanged"
+tick, which still advances the ID tracker). A record cut short by a
+crash is ignored when reading.
+"""
+
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'RTIOCREC1\n'
+RECORD_HEADER = struct.Struct('<dHI')
+
+
+class FrameRecorder:
+    """Appends (arrival time, session id, JPEG or b'' for a heartbeat) records, thread-safe"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def write(self, sid, jpeg, arrival=None):
+        sid_bytes = (sid or '').encode('utf-8')
+        header = RECORD_HEADER.pack(time.time() if arrival is None else arrival,
+                                    len(sid_bytes), len(jpeg))
+        with self._lock:
+            self._file.write(header + sid_bytes + bytes(jpeg))
+            self._file.flush()
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_records(path):
+    """Yield (arrival, session id, JPEG bytes) in recording order"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an RTIOC recording")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            arrival, sid_len, jpeg_len = RECORD_HEADER.unpack(header)
+            sid = f.read(sid_len)
+            jpeg = f.read(jpeg_len)
+            if len(sid) < sid_len or len(jpeg) < jpeg_len:
+                return   # truncated last record
+            yield arrival, sid.decode('utf-8'), jpeg
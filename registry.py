@@ -0,0 +1,115 @@
+"""
+Model registry for RTIOC
+
+Weights are registered by name ('face', 'id', 'id:tenant-a'...) and only
+loaded the first time a request needs them. Loaded models sit in an LRU
+bounded by count and by estimated weight bytes; the least recently used
+one is dropped when a new one would go over either limit. Pinned models
+(the detectors every frame needs) are never dropped and don't count
+towards max_models.
+
+A request still holding an evicted model finishes with it — the registry
+only drops its own reference.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def model_bytes(model, path):
+    """Parameter + buffer bytes of a loaded model (file size if it has no torch module)"""
+    net = getattr(model, 'model', None)
+    try:
+        return sum(t.numel() * t.element_size()
+                   for t in itertools.chain(net.parameters(), net.buffers()))
+    except AttributeError:
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class ModelRegistry:
+    """Named weights, loaded on first use and kept in a bounded LRU"""
+
+    def __init__(self, loader, max_models=4, max_bytes=None):
+        self.loader = loader         # path -> model, e.g. ultralytics.YOLO
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.paths = {}
+        self.pinned = set()
+        self._loaded = OrderedDict()   # name -> (model, nbytes)
+        self._loading = {}             # name -> lock held while it loads
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def register(self, name, path, pinned=False):
+        self.paths[name] = path
+        if pinned:
+            self.pinned.add(name)
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def path(self, name):
+        return self.paths[name]
+
+    def get(self, name):
+        """The loaded model registered as name, loading it if needed"""
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                self._loaded.move_to_end(name)
+                return entry[0]
+            if name not in self.paths:
+                raise KeyError(f"unknown model {name!r}")
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        # Loading takes seconds — other models stay usable meanwhile, and
+        # concurrent requests for this one wait for a single load
+        with load_lock:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is not None:
+                    self._loaded.move_to_end(name)
+                    return entry[0]
+            path = self.paths[name]
+            t0 = time.perf_counter()
+            model = self.loader(path)
+            nbytes = model_bytes(model, path)
+            with self._lock:
+                self._loaded[name] = (model, nbytes)
+                self.nbytes += nbytes
+                self.loads += 1
+                self._evict()
+        print(f"✅ Loaded model {name} ({path}, {nbytes / 1e6:.1f} MB) "
+              f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return model
+
+    def _evict(self):
+        """Drop least recently used unpinned models until both limits hold"""
+        for name in list(self._loaded):
+            unpinned = sum(n not in self.pinned for n in self._loaded)
+            over_count = self.max_models is not None and unpinned > self.max_models
+            over_bytes = self.max_bytes is not None and self.nbytes > self.max_bytes
+            if not (over_count or over_bytes):
+                return
+            # the newest entry stays even if it alone is over the byte budget
+            if name in self.pinned or name == next(reversed(self._loaded)):
+                continue
+            _, nbytes = self._loaded.pop(name)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+    def preload(self, names=None):
+        """Load the given (default: pinned) models now instead of on first use"""
+        for name in self.pinned if names is None else names:
+            if name in self.paths:
+                self.get(name)
+
+    def stats(self):
+        with self._lock:
+            return {'registered': sorted(self.paths), 'loaded': list(self._loaded),
+                    'bytes': self.nbytes, 'loads': self.loads, 'evictions': self.evictions}
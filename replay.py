@@ -0,0 +1,140 @@
+"""
+Replay a frame recording through the RTIOC pipeline
+
+Record production traffic with RTIOC_RECORD=recordings/prod.rtrec, then
+push the same frames, in the same order and per session, through
+run_detection (and so update_id_tracker) here:
+
+    python replay.py recordings/prod.rtrec --out runs/v1.jsonl
+    python replay.py recordings/prod.rtrec --speed 4 --out runs/v2.jsonl --compare runs/v1.jsonl
+
+--speed 1 keeps the recorded arrival times, 4 plays four times faster and
+0 (the default) as fast as possible. Each frame's latency, face/ID counts
+and overlays (the tracker output) go to --out as one JSON line, so two
+versions can be diffed frame by frame. No latency budget is applied, so
+the overlays only depend on the frames and the code.
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from recording import read_records
+
+
+def replay(rtioc, path, speed):
+    """Yield one result dict per recorded frame"""
+    sessions = {}
+    start = first = None
+    for i, (arrival, sid, jpeg) in enumerate(read_records(path)):
+        if first is None:
+            first, start = arrival, time.perf_counter()
+        if speed > 0:
+            delay = (arrival - first) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        session = sessions.get(sid)
+        if session is None:
+            session = sessions[sid] = rtioc.new_session()
+        t0 = time.perf_counter()
+        if not jpeg:
+            # heartbeat: the tracker counts the session's last frame once more
+            result = rtioc.run_heartbeat(session)
+            if result is None:
+                yield {'i': i, 'session': sid, 'error': 'heartbeat before first frame'}
+                continue
+            faces, ids, overlays = result
+            yield {
+                'i': i,
+                'session': sid,
+                'offset': round(arrival - first, 4),
+                'latency_ms': round((time.perf_counter() - t0) * 1000, 3),
+                'faces': faces,
+                'ids': ids,
+                'overlays': [[o['kind']] + o['box'] for o in overlays],
+                'skipped': [],
+                'heartbeat': True,
+            }
+            continue
+        frame = rtioc.CODEC.decode(jpeg, max_side=rtioc.DECODE_MAX_SIDE)
+        if frame is None:
+            yield {'i': i, 'session': sid, 'error': 'decode'}
+            continue
+        _, faces, ids, overlays, skipped = rtioc.run_detection(
+            frame, annotate=False, session=session, jpeg=jpeg)
+        yield {
+            'i': i,
+            'session': sid,
+            'offset': round(arrival - first, 4),
+            'latency_ms': round((time.perf_counter() - t0) * 1000, 3),
+            'faces': faces,
+            'ids': ids,
+            'overlays': [[o['kind']] + o['box'] for o in overlays],
+            'skipped': skipped,
+        }
+
+
+def load_run(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(rows):
+    lat = sorted(r['latency_ms'] for r in rows if 'latency_ms' in r)
+    if not lat:
+        print("  no frames replayed")
+        return
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    errors = sum('error' in r for r in rows)
+    print(f"  {len(rows)} frames, {len({r['session'] for r in rows})} sessions, {errors} errors")
+    print(f"  latency   mean {statistics.fmean(lat):7.2f} ms   p50 {statistics.median(lat):7.2f} ms"
+          f"   p99 {p99:7.2f} ms")
+
+
+def compare(rows, baseline):
+    """Print how this run's tracker output and latency differ from a baseline run"""
+    if len(rows) != len(baseline):
+        print(f"  ⚠️  frame count differs: {len(rows)} vs {len(baseline)} in baseline")
+    changed = [r['i'] for r, b in zip(rows, baseline)
+               if r.get('overlays') != b.get('overlays')]
+    print(f"  overlays differ on {len(changed)} of {min(len(rows), len(baseline))} frames"
+          + (f" (first: frame {changed[0]})" if changed else ""))
+    new = [r['latency_ms'] for r in rows if 'latency_ms' in r]
+    old = [b['latency_ms'] for b in baseline if 'latency_ms' in b]
+    if new and old:
+        delta = statistics.median(new) - statistics.median(old)
+        print(f"  p50 latency {delta:+.2f} ms vs baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an RTIOC frame recording")
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="1 = recorded pace, N = N times faster, 0 = as fast as possible")
+    parser.add_argument('--out', help="write per-frame results as JSON lines")
+    parser.add_argument('--compare', help="earlier --out file to diff against")
+    args = parser.parse_args()
+
+    import app_final3 as rtioc
+
+    rows = []
+    out = open(args.out, 'w') if args.out else None
+    try:
+        for row in replay(rtioc, args.recording, args.speed):
+            rows.append(row)
+            if out is not None:
+                out.write(json.dumps(row) + '\n')
+    finally:
+        if out is not None:
+            out.close()
+
+    print(f"🔁 Replayed {args.recording}")
+    summarize(rows)
+    if args.compare:
+        compare(rows, load_run(args.compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+"""
+Session-affinity router for several RTIOC inference nodes
+
+Every session id is consistently hashed onto one node, so a browser's
+ID-card tracker (and frame pool, motion reference...) stays on the node
+that built it. A health checker polls /healthz on every node; a node
+that fails HEALTH_FAILURES checks in a row (or refuses a forwarded
+request) leaves the ring and comes back once it answers again. Only the
+sessions that hashed to that node move — to their next node on the ring,
+where they start with a fresh tracker.
+
+    python router.py --node http://10.0.0.2:5000 --node http://10.0.0.3:5000
+    python router.py --spawn 3 --stub     # 3 local stub-model nodes on ports 5001-5003
+
+Routes: /process_frame and /stream/<session>.mjpg by session, / from any
+healthy node, /stats with the router's ring and every node's /stats.
+"""
+
+import argparse
+import bisect
+import hashlib
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+RING_REPLICAS    = 128   # virtual points per node — smooths the key spread
+HEALTH_INTERVAL  = 2.0   # seconds between health checks
+HEALTH_FAILURES  = 2     # failed checks in a row before a node leaves the ring
+HEALTH_TIMEOUT   = 2.0
+CONNECT_TIMEOUT  = 2.0    # only a failed connect takes a node out of the ring
+FORWARD_TIMEOUT  = 60.0   # reply wait; a slow reply is a 504, not a dead node
+SESSION_HEADER   = 'X-RTIOC-Session'   # lets clients skip the JSON peek
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hash ring with RING_REPLICAS virtual points per node"""
+
+    def __init__(self, nodes=(), replicas=RING_REPLICAS):
+        self.replicas = replicas
+        self._points = []   # sorted hashes
+        self._owners = {}   # hash -> node
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = ring_hash(f"{node}#{i}")
+            if h not in self._owners:
+                bisect.insort(self._points, h)
+                self._owners[h] = node
+
+    def remove(self, node):
+        self._points = [h for h in self._points if self._owners[h] != node]
+        self._owners = {h: n for h, n in self._owners.items() if n != node}
+
+    def nodes_for(self, key):
+        """Distinct nodes in ring order from key's position (owner first)"""
+        if not self._points:
+            return []
+        seen = []
+        i = bisect.bisect(self._points, ring_hash(key))
+        for j in range(len(self._points)):
+            node = self._owners[self._points[(i + j) % len(self._points)]]
+            if node not in seen:
+                seen.append(node)
+        return seen
+
+
+class NodeUnreachable(Exception):
+    """Connecting to a node failed — nothing was sent to it"""
+
+
+class Node:
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.url = url.rstrip('/')
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 80
+        self.healthy = False   # joins the ring on its first good health check
+        self.failures = 0
+        self.forwarded = 0
+        self._local = threading.local()   # one keep-alive connection per router thread
+
+    def connection(self, fresh=False, pooled=True, timeout=FORWARD_TIMEOUT):
+        """
+        Connected HTTPConnection (NodeUnreachable if the connect fails).
+        pooled=False gives a one-off connection, e.g. for a stream.
+        """
+        conn = getattr(self._local, 'conn', None) if pooled else None
+        if conn is None or fresh or conn.sock is None:
+            if conn is not None:
+                conn.close()
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+            try:
+                conn.connect()
+            except OSError as e:
+                raise NodeUnreachable(e)
+            if pooled:
+                self._local.conn = conn
+        conn.sock.settimeout(timeout)
+        return conn
+
+    def check(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=HEALTH_TIMEOUT)
+        try:
+            conn.request('GET', '/healthz')
+            return conn.getresponse().status == 200
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            conn.close()
+
+
+class Router:
+    """Ring of healthy nodes, kept up to date by a health-check thread"""
+
+    def __init__(self, urls):
+        self.nodes = {url.rstrip('/'): Node(url) for url in urls}
+        self.ring = HashRing()
+        self._lock = threading.Lock()
+        self.moves = 0
+        self._halt = threading.Event()
+
+    def route(self, key):
+        with self._lock:
+            return [self.nodes[n] for n in self.ring.nodes_for(key or '')]
+
+    def mark(self, node, healthy):
+        with self._lock:
+            if healthy:
+                node.failures = 0
+                if not node.healthy:
+                    node.healthy = True
+                    self.ring.add(node.url)
+                    self.moves += 1
+                    print(f"✅ {node.url} joined — {self.healthy_count()} healthy nodes")
+                return
+            node.failures += 1
+            if node.healthy and node.failures >= HEALTH_FAILURES:
+                node.healthy = False
+                self.ring.remove(node.url)
+                self.moves += 1
+                print(f"⚠️  {node.url} is down — its sessions move to the next node")
+
+    def fail_now(self, node):
+        """A forwarded request could not reach node: take it out without waiting"""
+        with self._lock:
+            node.failures = max(node.failures, HEALTH_FAILURES - 1)
+        self.mark(node, False)
+
+    def healthy_count(self):
+        return sum(n.healthy for n in self.nodes.values())
+
+    def check_loop(self):
+        while True:
+            for node in list(self.nodes.values()):
+                self.mark(node, node.check())
+            if self._halt.wait(HEALTH_INTERVAL):
+                return
+
+    def start(self):
+        threading.Thread(target=self.check_loop, daemon=True).start()
+
+    def stop(self):
+        self._halt.set()
+
+    def stats(self):
+        nodes = {}
+        for url, node in self.nodes.items():
+            info = {'healthy': node.healthy, 'forwarded': node.forwarded}
+            if node.healthy:
+                try:
+                    conn = http.client.HTTPConnection(node.host, node.port,
+                                                      timeout=HEALTH_TIMEOUT)
+                    conn.request('GET', '/stats')
+                    info['stats'] = json.loads(conn.getresponse().read())
+                    conn.close()
+                except (OSError, http.client.HTTPException, ValueError):
+                    pass
+            nodes[url] = info
+        return {'healthy': self.healthy_count(), 'rebalances': self.moves, 'nodes': nodes}
+
+
+def session_of(path, headers, body):
+    """Session id a request belongs to: header, stream key or the JSON body"""
+    if headers.get(SESSION_HEADER):
+        return headers[SESSION_HEADER]
+    if path.startswith('/stream/') and path.endswith('.mjpg'):
+        return path[len('/stream/'):-len('.mjpg')]
+    if body:
+        try:
+            return json.loads(body).get('session')
+        except (ValueError, AttributeError):
+            return None
+    return None
+
+
+class RouterHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    router = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/stats':
+            return self.reply(200, json.dumps(self.router.stats()).encode(), 'application/json')
+        if self.path == '/healthz':
+            ok = self.router.healthy_count() > 0
+            body = json.dumps({'status': 'ok' if ok else 'down'}).encode()
+            return self.reply(200 if ok else 503, body, 'application/json')
+        self.forward('GET', None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.forward('POST', self.rfile.read(length))
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def forward(self, method, body):
+        sid = session_of(self.path, self.headers, body)
+        headers = {'Content-Type': self.headers.get('Content-Type', 'application/json')}
+        headers.update((k, v) for k, v in self.headers.items() if k.lower().startswith('x-rtioc-'))
+        for node in self.router.route(sid):
+            try:
+                resp = self.send_upstream(node, method, body, headers)
+            except NodeUnreachable:
+                self.router.fail_now(node)
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                # the node took the request but the reply failed or timed out: it may
+                # still be working on it, so it stays in the ring and isn't re-sent
+                status = 504 if isinstance(e, TimeoutError) else 502
+                return self.reply(status, json.dumps({'status': 'error', 'message': str(e)})
+                                  .encode(), 'application/json')
+            node.forwarded += 1
+            return self.relay(resp)
+        self.reply(503, b'{"status": "error", "message": "no healthy nodes"}', 'application/json')
+
+    def send_upstream(self, node, method, body, headers):
+        if self.path.startswith('/stream/'):
+            # a stream sends nothing until its first frame: no read timeout
+            conn = node.connection(pooled=False, timeout=None)
+            conn.request(method, self.path, body=body, headers=headers)
+            return conn.getresponse()
+        for attempt in (0, 1):
+            conn = node.connection(fresh=attempt > 0)
+            try:
+                conn.request(method, self.path, body=body, headers=headers)
+            except (OSError, http.client.HTTPException):
+                # a pooled connection the node already closed fails on send —
+                # the request never arrived, so one retry on a new one is safe
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            try:
+                return conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                # a GET may be repeated if the idle connection was dropped; a POST
+                # (a frame that moved the tracker) or a timeout never is
+                if attempt or method != 'GET' or isinstance(e, TimeoutError):
+                    raise
+
+    def relay(self, resp):
+        self.send_response(resp.status)
+        length = resp.getheader('Content-Length')
+        for name in ('Content-Type', 'Cache-Control'):
+            if resp.getheader(name):
+                self.send_header(name, resp.getheader(name))
+        if length is not None:
+            body = resp.read()
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        # Streaming (MJPEG) response: pass chunks through until either side closes
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                chunk = resp.read1(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            resp.close()
+
+
+def spawn_nodes(count, base_port, stub):
+    here = os.path.dirname(os.path.abspath(__file__))
+    procs, urls = [], []
+    for i in range(count):
+        port = base_port + i
+        env = dict(os.environ, RTIOC_PORT=str(port))
+        if stub:
+            env['RTIOC_STUB_MODELS'] = '1'
+        procs.append(subprocess.Popen([sys.executable, os.path.join(here, 'app_final3.py')],
+                                      cwd=here, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        urls.append(f"http://127.0.0.1:{port}")
+    return procs, urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTIOC session-affinity router")
+    parser.add_argument('--node', action='append', default=[], help="inference node URL")
+    parser.add_argument('--spawn', type=int, default=0, help="start N local nodes")
+    parser.add_argument('--base-port', type=int, default=5001, help="first port of --spawn nodes")
+    parser.add_argument('--stub', action='store_true', help="--spawn nodes use stub models")
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    procs, urls = spawn_nodes(args.spawn, args.base_port, args.stub) if args.spawn else ([], [])
+    urls += args.node
+    if not urls:
+        raise SystemExit("❌ ERROR: give at least one --node or --spawn N")
+
+    router = Router(urls)
+    router.start()
+    RouterHandler.router = router
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), RouterHandler)
+    server.daemon_threads = True
+    print(f"🔀 Routing http://localhost:{args.port} across {len(urls)} nodes: {', '.join(urls)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        router.stop()
+        server.server_close()
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
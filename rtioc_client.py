@@ -0,0 +1,165 @@
+"""
+Python client for the RTIOC binary redaction service (binserver.py)
+
+    from rtioc_client import RedactionClient
+
+    client = RedactionClient('10.0.0.2', 5050, pool_size=4)
+    result = client.redact(jpeg_bytes, session='cam-1')        # blocking
+    futures = [client.submit(j, session='cam-1') for j in batch]  # pipelined
+    results = [f.result() for f in futures]
+
+Connections are pooled, and each session always uses the same one, so its
+frames arrive in order and share one tracker on the server. Up to
+max_in_flight requests per connection are sent without waiting for
+replies. Needs only the standard library (plus numpy for BGR frames).
+"""
+
+import itertools
+import socket
+import threading
+import zlib
+from collections import namedtuple
+from concurrent.futures import Future
+
+import wire
+
+Box = namedtuple('Box', 'kind blurred x1 y1 x2 y2')
+Result = namedtuple('Result', 'boxes image width height')
+
+
+class RedactionError(Exception):
+    pass
+
+
+class Connection:
+    """One socket with a reader thread resolving the futures of pipelined requests"""
+
+    def __init__(self, host, port, max_in_flight, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.waiting = {}   # request id -> (future, format)
+        self.ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def submit(self, payload, session, fmt, flags, width, height):
+        self.slots.acquire()
+        future = Future()
+        with self._send_lock:
+            if self.closed:
+                self.slots.release()
+                raise ConnectionError("connection closed")
+            request_id = next(self.ids) & 0xFFFFFFFF
+            self.waiting[request_id] = (future, fmt)
+            head, body = wire.pack_request(request_id, payload, session, fmt, flags, width, height)
+            try:
+                self.sock.sendall(head)
+                self.sock.sendall(body)
+            except OSError:
+                self.waiting.pop(request_id, None)
+                self.slots.release()
+                self._fail(ConnectionError("send failed"))
+                raise
+        return future
+
+    def _read_loop(self):
+        try:
+            while True:
+                request_id, status, fmt, boxes, w, h, payload = wire.read_response(self.sock)
+                future, _ = self.waiting.pop(request_id, (None, None))
+                self.slots.release()
+                if future is None:
+                    continue
+                if status != wire.STATUS_OK:
+                    future.set_exception(RedactionError(payload.decode('utf-8', 'replace')))
+                    continue
+                image = payload or None
+                if image is not None and fmt == wire.FORMAT_BGR:
+                    import numpy as np
+                    image = np.frombuffer(payload, dtype=np.uint8).reshape(h, w, 3)
+                boxes = [Box(wire.KINDS[b[0]], bool(b[1]), *b[2:]) for b in boxes]
+                future.set_result(Result(boxes, image, w, h))
+        except Exception as e:
+            # fail every pending future, whatever stopped the reader
+            self._fail(e)
+
+    def _fail(self, error):
+        self.closed = True
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        for request_id in list(self.waiting):
+            future, _ = self.waiting.pop(request_id, (None, None))
+            if future is None:
+                continue
+            self.slots.release()   # wakes submitters blocked on this connection
+            if not future.done():
+                future.set_exception(ConnectionError(f"connection lost: {error}"))
+
+    def close(self):
+        self._fail(ConnectionError("closed by client"))
+
+
+class RedactionClient:
+    """Pool of pipelined connections; a session sticks to one of them"""
+
+    def __init__(self, host='127.0.0.1', port=wire.DEFAULT_PORT, pool_size=4,
+                 max_in_flight=8, timeout=10.0):
+        self.host, self.port = host, port
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._pool = [None] * pool_size
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+
+    def _connection(self, session):
+        # sessions hash to a fixed slot; anonymous requests round-robin
+        if session:
+            slot = zlib.crc32(session.encode('utf-8')) % len(self._pool)
+        else:
+            slot = next(self._next) % len(self._pool)
+        with self._lock:
+            conn = self._pool[slot]
+            if conn is None or conn.closed:
+                conn = self._pool[slot] = Connection(self.host, self.port,
+                                                     self.max_in_flight, self.timeout)
+        return conn
+
+    def submit(self, image, session='', boxes_only=False, bulk=False):
+        """
+        Send a frame without waiting; returns a Future of a Result.
+        image is JPEG bytes or an (h, w, 3) uint8 BGR array; the redacted
+        image comes back in the same form (None with boxes_only).
+        bulk=True queues it behind live sessions on the server.
+        """
+        flags = (wire.FLAG_BOXES_ONLY if boxes_only else 0) | (wire.FLAG_BULK if bulk else 0)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            fmt, payload, w, h = wire.FORMAT_JPEG, image, 0, 0
+        else:
+            h, w = image.shape[:2]
+            fmt = wire.FORMAT_BGR
+            if image.flags['C_CONTIGUOUS']:
+                payload = memoryview(image).cast('B')   # sent without a copy
+            else:
+                payload = image.tobytes()
+        return self._connection(session).submit(payload, session, fmt, flags, w, h)
+
+    def redact(self, image, session='', boxes_only=False, timeout=None, bulk=False):
+        return self.submit(image, session, boxes_only, bulk).result(timeout)
+
+    def close(self):
+        with self._lock:
+            for conn in self._pool:
+                if conn is not None:
+                    conn.close()
+            self._pool = [None] * len(self._pool)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
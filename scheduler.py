@@ -0,0 +1,244 @@
+"""
+Fair inference scheduling across sessions
+
+Without it, whichever request thread reaches the models first runs first,
+so one fast client can keep everyone else waiting. FairScheduler hands
+out a fixed number of inference slots instead:
+
+  - priority classes are served strictly in rank order (live before bulk),
+    except that a frame waiting longer than starvation_ms is served next
+    whatever its class — and counted as starved
+  - within a rank, sessions share model time by start-time fair queuing:
+    every frame is tagged with its session's virtual start time, advanced
+    by the session's measured inference time divided by its weight, so a
+    session with large or frequent frames falls behind the others
+  - a per-session token bucket caps frames per second (max_fps per class);
+    frames over the cap are refused before they are even decoded
+
+Per-session queue waits (p50/p99/max), starved and throttled counts are
+kept for /stats.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+WAIT_SAMPLES = 256    # recent queue waits kept per session for percentiles
+FPS_BURST    = 2      # frames a session may send back to back under its cap
+COST_ALPHA   = 0.2    # smoothing of a session's measured inference time
+SESSION_IDLE = 300    # seconds before an idle session's state is forgotten
+MAX_SESSIONS = 1024   # sessions kept at most; the least recently seen idle one goes first
+
+
+class Throttled(Exception):
+    """The session is over its class's frames-per-second cap"""
+
+
+class _Session:
+    def __init__(self, klass, now):
+        self.klass = klass
+        self.finish = 0.0     # virtual time its last frame finishes
+        self.cost = 1.0       # smoothed inference ms per frame
+        self.tokens = FPS_BURST
+        self.refilled = now
+        self.seen = now
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.queued = 0
+        self.served = 0
+        self.throttled = 0
+        self.starved = 0
+
+
+class _Ticket:
+    __slots__ = ('key', 'rank', 'start', 'arrival', 'grant', 'granted', 'started')
+
+    def __init__(self, key, rank, start, grant):
+        self.key = key
+        self.rank = rank
+        self.start = start
+        self.arrival = time.perf_counter()
+        self.grant = grant
+        self.granted = False
+        self.started = None
+
+
+class FairScheduler:
+    """
+    slots: frames allowed in the models at once.
+    classes: name -> (rank, weight, max_fps); lower ranks run first,
+    max_fps None means uncapped.
+    """
+
+    def __init__(self, slots=1, classes=None, starvation_ms=1000):
+        self.classes = classes or {'live': (0, 1.0, None)}
+        self.slots = slots
+        self.starvation = starvation_ms / 1000.0
+        self.sessions = OrderedDict()   # least recently seen first
+        self._free = slots
+        self._waiting = []
+        self._lock = threading.Lock()
+        self.vtime = 0.0
+        self.served = 0
+        self.starved = 0
+        self.throttled = 0
+
+    def _session(self, key, klass, now):
+        session = self.sessions.get(key)
+        if session is None:
+            self._expire(now)
+            session = self.sessions[key] = _Session(klass, now)
+        else:
+            self.sessions.move_to_end(key)
+        session.klass = klass
+        session.seen = now
+        return session
+
+    def _expire(self, now):
+        """
+        Forget sessions idle for SESSION_IDLE, and the least recently seen
+        ones beyond MAX_SESSIONS. The table is in last-seen order, so this
+        only looks at the oldest entries. Sessions with queued frames stay.
+        """
+        for _ in range(len(self.sessions)):
+            key, oldest = next(iter(self.sessions.items()))
+            if len(self.sessions) < MAX_SESSIONS and now - oldest.seen <= SESSION_IDLE:
+                break
+            if oldest.queued:
+                self.sessions.move_to_end(key)
+            else:
+                del self.sessions[key]
+
+    def admit(self, key, klass):
+        """Take one frame from the session's FPS budget; Throttled if it has none"""
+        if klass not in self.classes:
+            raise ValueError(f"unknown priority class {klass!r}")
+        max_fps = self.classes[klass][2]
+        now = time.perf_counter()
+        with self._lock:
+            session = self._session(key, klass, now)
+            if max_fps is None:
+                return
+            session.tokens = min(FPS_BURST, session.tokens + (now - session.refilled) * max_fps)
+            session.refilled = now
+            if session.tokens < 1.0:
+                session.throttled += 1
+                self.throttled += 1
+                raise Throttled(f"over {max_fps:g} fps")
+            session.tokens -= 1.0
+
+    def submit(self, key, klass, grant):
+        """
+        Queue one frame; grant() is called (possibly on another thread) once
+        it holds a slot. Returns the ticket for release() / cancel().
+        """
+        rank, weight, _ = self.classes[klass]
+        now = time.perf_counter()
+        with self._lock:
+            session = self._session(key, klass, now)
+            start = max(self.vtime, session.finish)
+            session.finish = start + session.cost / weight
+            session.queued += 1
+            ticket = _Ticket(key, rank, start, grant)
+            if self._free > 0 and not self._waiting:
+                self._free -= 1
+                self._start(ticket)
+            else:
+                self._waiting.append(ticket)
+        if ticket.granted:
+            grant()
+        return ticket
+
+    def _next(self):
+        """Starved frames first (oldest first), then lowest rank, then earliest start tag"""
+        now = time.perf_counter()
+        starved = [t for t in self._waiting if now - t.arrival > self.starvation]
+        if starved:
+            return min(starved, key=lambda t: t.arrival)
+        return min(self._waiting, key=lambda t: (t.rank, t.start, t.arrival))
+
+    def _start(self, ticket):
+        ticket.granted = True
+        ticket.started = time.perf_counter()
+        self.vtime = max(self.vtime, ticket.start)
+        session = self.sessions.get(ticket.key)
+        wait = ticket.started - ticket.arrival
+        if session is not None:
+            session.waits.append(wait * 1000)
+            if wait > self.starvation:
+                session.starved += 1
+        if wait > self.starvation:
+            self.starved += 1
+
+    def release(self, ticket):
+        """The ticket's frame left the models: record its cost, hand the slot on"""
+        now = time.perf_counter()
+        with self._lock:
+            session = self.sessions.get(ticket.key)
+            if session is not None:
+                ms = (now - ticket.started) * 1000
+                session.cost += COST_ALPHA * (ms - session.cost)
+                session.queued -= 1
+                session.served += 1
+            self.served += 1
+            granted = self._hand_on()
+        if granted is not None:
+            granted.grant()
+
+    def cancel(self, ticket):
+        """Give up a ticket whose caller went away (releases it if it already ran)"""
+        with self._lock:
+            if not ticket.granted:
+                self._waiting.remove(ticket)
+                session = self.sessions.get(ticket.key)
+                if session is not None:
+                    session.queued -= 1
+                return
+        self.release(ticket)
+
+    def _hand_on(self):
+        if not self._waiting:
+            self._free += 1
+            return None
+        ticket = self._next()
+        self._waiting.remove(ticket)
+        self._start(ticket)
+        return ticket
+
+    def slot(self, key, klass):
+        """Context manager holding one inference slot (blocks the calling thread)"""
+        return _Slot(self, key, klass)
+
+    def stats(self):
+        with self._lock:
+            sessions = {}
+            for key, s in self.sessions.items():
+                waits = sorted(s.waits) or [0.0]
+                sessions[key] = {
+                    'class': s.klass, 'queued': s.queued, 'served': s.served,
+                    'throttled': s.throttled, 'starved': s.starved,
+                    'wait_ms_p50': round(waits[len(waits) // 2], 1),
+                    'wait_ms_p99': round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 1),
+                    'wait_ms_max': round(waits[-1], 1),
+                    'infer_ms': round(s.cost, 1),
+                }
+            return {'slots': self.slots, 'busy': self.slots - self._free,
+                    'queued': len(self._waiting), 'served': self.served,
+                    'starved': self.starved, 'throttled': self.throttled,
+                    'sessions': sessions}
+
+
+class _Slot:
+    def __init__(self, scheduler, key, klass):
+        self.scheduler = scheduler
+        self.key = key
+        self.klass = klass
+        self.ticket = None
+
+    def __enter__(self):
+        ready = threading.Event()
+        self.ticket = self.scheduler.submit(self.key, self.klass, ready.set)
+        ready.wait()
+        return self.ticket
+
+    def __exit__(self, *exc):
+        self.scheduler.release(self.ticket)
@@ -0,0 +1,91 @@
+"""
+MJPEG fan-out for redacted feeds
+
+Publishers (a browser session or an ingest source) hand in one encoded
+JPEG per frame; every viewer of that key gets the same bytes object. A
+viewer that is slower than the feed simply picks up the newest frame when
+it is ready again — nothing is queued per viewer.
+"""
+
+import threading
+from collections import Counter
+
+BOUNDARY = 'frame'
+STREAM_IDLE_TIMEOUT = 30.0   # close a viewer when its feed stops publishing
+
+
+def mjpeg_part(jpg):
+    """Chunks of one multipart/x-mixed-replace part; jpg itself is passed through uncopied"""
+    return (b'--' + BOUNDARY.encode() + b'\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            b'Content-Length: ' + str(len(jpg)).encode() + b'\r\n\r\n', jpg, b'\r\n')
+
+
+class FrameHub:
+    """Latest encoded JPEG per key, shared by reference with all viewers"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frames = {}          # key -> (seq, jpeg bytes)
+        self._viewers = Counter()
+        self._listeners = set()    # callables(key) woken on publish/drop (async viewers)
+        self._seq = 0              # global, so a re-published key never goes backwards
+
+    def publish(self, key, jpg):
+        with self._cond:
+            self._seq += 1
+            self._frames[key] = (self._seq, jpg)
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for wake in listeners:
+            wake(key)
+
+    def has_viewers(self, key):
+        """Publishers check this first so nobody encodes for an empty room"""
+        return self._viewers[key] > 0
+
+    def drop(self, key):
+        with self._cond:
+            self._frames.pop(key, None)
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for wake in listeners:
+            wake(key)
+
+    def latest(self, key):
+        """(seq, jpeg) of the newest frame of key, (0, None) if there is none"""
+        with self._cond:
+            return self._frames.get(key, (0, None))
+
+    def watch(self, key, wake=None):
+        """Count a viewer of key; wake(key) is called on every publish/drop"""
+        with self._cond:
+            self._viewers[key] += 1
+            if wake is not None:
+                self._listeners.add(wake)
+
+    def unwatch(self, key, wake=None):
+        with self._cond:
+            self._viewers[key] -= 1
+            if self._viewers[key] <= 0:
+                del self._viewers[key]
+            self._listeners.discard(wake)
+
+    def stream(self, key, timeout=STREAM_IDLE_TIMEOUT):
+        """multipart/x-mixed-replace body; always sends the newest frame"""
+        self.watch(key)
+        last = 0
+        try:
+            while True:
+                with self._cond:
+                    fresh = self._cond.wait_for(
+                        lambda: self._frames.get(key, (0, None))[0] > last, timeout)
+                    if not fresh:
+                        return
+                    last, jpg = self._frames[key]
+                yield from mjpeg_part(jpg)
+        finally:
+            self.unwatch(key)
+
+
+HUB = FrameHub()
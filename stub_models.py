@@ -0,0 +1,72 @@
+"""
+Stand-in detectors for load testing and pipeline benchmarks
+
+Set RTIOC_STUB_MODELS=1 to make app_final3.py use StubYOLO instead of
+loading real weights. Each predict() sleeps for RTIOC_STUB_LATENCY_MS
+(default 20) and returns fixed boxes placed relative to the input frame,
+so the whole request path (decode, tracking, redaction, encode) runs
+as usual without a GPU or model files.
+"""
+
+import os
+import time
+
+import numpy as np
+
+STUB_LATENCY_MS = float(os.environ.get('RTIOC_STUB_LATENCY_MS', 20))
+
+# Boxes as fractions of the frame: x1, y1, x2, y2, conf, cls
+_FACE_BOXES = np.array([[0.35, 0.20, 0.60, 0.60, 0.90, 0],    # speaker
+                        [0.75, 0.10, 0.88, 0.32, 0.70, 0]],   # background face
+                       dtype=np.float32)
+_ID_BOXES = np.array([[0.08, 0.55, 0.38, 0.85, 0.85, 0]], dtype=np.float32)
+_UNIFIED_BOXES = np.concatenate([_FACE_BOXES, _ID_BOXES])
+_UNIFIED_BOXES[len(_FACE_BOXES):, 5] = 1   # class 1 = ID card (UNIFIED_CLASSES)
+
+
+class _Array:
+    """Mimics the .cpu().numpy() chain of a torch tensor"""
+
+    def __init__(self, arr):
+        self._arr = arr
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._arr
+
+
+class _Boxes:
+    def __init__(self, data):
+        self.data = _Array(data)
+
+    def __len__(self):
+        return len(self.data.numpy())
+
+
+class _Result:
+    def __init__(self, data):
+        self.boxes = _Boxes(data)
+
+
+class StubYOLO:
+    """Drop-in for ultralytics.YOLO with a fixed latency and fixed boxes"""
+
+    def __init__(self, path, task=None):
+        self.path = path
+        name = os.path.basename(path).lower()
+        if 'unified' in name:
+            self._boxes = _UNIFIED_BOXES
+        elif 'face' in name:
+            self._boxes = _FACE_BOXES
+        else:
+            self._boxes = _ID_BOXES
+
+    def predict(self, source, conf=0.25, verbose=False, imgsz=None, device=None):
+        time.sleep(STUB_LATENCY_MS / 1000.0)
+        h, w = source.shape[:2]
+        data = self._boxes[self._boxes[:, 4] >= conf].copy()
+        data[:, [0, 2]] *= w
+        data[:, [1, 3]] *= h
+        return [_Result(data)]
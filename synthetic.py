@@ -0,0 +1,220 @@
+"""
+Synthetic scenes with ground truth for RTIOC benchmarks
+
+Real faces and ID cards can't go into test fixtures, so this draws
+cartoon faces and card-like rectangles (photo, stripe, text lines) onto
+generated backgrounds. Every object has a controlled size, a distance
+that changes over the clip (so it shrinks or grows) and a motion path,
+and each frame comes with its exact boxes.
+
+    python synthetic.py --out data/synth --frames 300 --faces 2 --cards 1
+writes images/NNNNN.jpg and YOLO labels/NNNNN.txt (class ids from
+UNIFIED_CLASSES: 0 face, 1 ID card), usable with
+    python benchmark.py unified --images data/synth/images --labels data/synth/labels
+benchmark.py's synthetic section uses the same scenes in memory.
+"""
+
+import argparse
+import math
+import os
+
+import cv2
+import numpy as np
+
+CLASS_IDS = {'face': 0, 'id': 1}   # same as app_final3.UNIFIED_CLASSES
+CARD_ASPECT = 85.6 / 54.0           # ID-1 card format
+FACE_ASPECT = 1.3                   # height / width
+SKIN_TONES = [(190, 210, 240), (140, 170, 215), (100, 130, 180), (60, 85, 125)]
+
+
+def make_background(w, h, rng):
+    """Indoor-ish backdrop: soft gradient, a few blocks of furniture, sensor noise"""
+    top = rng.integers(60, 200, 3).astype(np.float32)
+    bottom = rng.integers(30, 160, 3).astype(np.float32)
+    ramp = np.linspace(0.0, 1.0, h, dtype=np.float32)[:, None, None]
+    frame = (top * (1 - ramp) + bottom * ramp) * np.ones((1, w, 1), np.float32)
+    frame = frame.astype(np.uint8)
+    for _ in range(int(rng.integers(3, 8))):
+        x1, y1 = int(rng.integers(0, w)), int(rng.integers(0, h))
+        x2 = x1 + int(rng.integers(w // 10, w // 3))
+        y2 = y1 + int(rng.integers(h // 10, h // 3))
+        color = tuple(int(c) for c in rng.integers(20, 230, 3))
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+    return frame
+
+
+def draw_face(frame, cx, cy, fw, skin, hair):
+    """Cartoon face centred on (cx, cy), fw pixels wide. Returns its box."""
+    fh = fw * FACE_ASPECT
+    ax, ay = max(1, round(fw / 2)), max(1, round(fh / 2))
+    c = (round(cx), round(cy))
+    cv2.ellipse(frame, (c[0], round(cy - fh * 0.12)), (ax + 1, round(ay * 0.85)),
+                0, 180, 360, hair, -1, cv2.LINE_AA)
+    cv2.ellipse(frame, c, (ax, ay), 0, 0, 360, skin, -1, cv2.LINE_AA)
+    eye_r = max(1, round(fw * 0.07))
+    for side in (-1, 1):
+        ex, ey = round(cx + side * fw * 0.2), round(cy - fh * 0.08)
+        cv2.circle(frame, (ex, ey), eye_r + 1, (245, 245, 245), -1, cv2.LINE_AA)
+        cv2.circle(frame, (ex, ey), eye_r, (40, 30, 20), -1, cv2.LINE_AA)
+        cv2.line(frame, (ex - eye_r * 2, ey - eye_r * 3), (ex + eye_r * 2, ey - eye_r * 3),
+                 hair, max(1, eye_r // 2), cv2.LINE_AA)
+    nose = (round(cx), round(cy + fh * 0.08))
+    cv2.line(frame, (nose[0], round(cy - fh * 0.02)), nose,
+             tuple(int(v * 0.8) for v in skin), max(1, eye_r // 2), cv2.LINE_AA)
+    cv2.ellipse(frame, (round(cx), round(cy + fh * 0.22)),
+                (max(1, round(fw * 0.18)), max(1, round(fh * 0.06))),
+                0, 0, 180, (60, 60, 150), max(1, eye_r // 2), cv2.LINE_AA)
+    return cx - ax, cy - ay, cx + ax, cy + ay
+
+
+def make_card(cw, rng):
+    """Card-like image cw pixels wide: header stripe, photo, text lines"""
+    ch = max(2, round(cw / CARD_ASPECT))
+    card = np.full((ch, cw, 3), rng.integers(200, 250, 3), dtype=np.uint8)
+    stripe = tuple(int(c) for c in rng.integers(40, 200, 3))
+    cv2.rectangle(card, (0, 0), (cw, round(ch * 0.18)), stripe, -1)
+    px1, py1 = round(cw * 0.06), round(ch * 0.26)
+    px2, py2 = round(cw * 0.34), round(ch * 0.90)
+    cv2.rectangle(card, (px1, py1), (px2, py2), (180, 180, 180), -1)
+    if px2 - px1 > 6:
+        skin = SKIN_TONES[int(rng.integers(len(SKIN_TONES)))]
+        draw_face(card, (px1 + px2) / 2, (py1 + py2) / 2 + ch * 0.04,
+                  (px2 - px1) * 0.6, skin, (30, 30, 30))
+    for i in range(4):
+        y = round(ch * (0.32 + i * 0.15))
+        x2 = round(cw * rng.uniform(0.6, 0.94))
+        cv2.line(card, (round(cw * 0.42), y), (x2, y), (70, 70, 70), max(1, ch // 30))
+    cv2.rectangle(card, (0, 0), (cw - 1, ch - 1), (110, 110, 110), 1)
+    return card
+
+
+def paste_card(frame, card, cx, cy, angle):
+    """Rotate card by angle degrees around its centre and paste it at (cx, cy)"""
+    ch, cw = card.shape[:2]
+    h, w = frame.shape[:2]
+    m = cv2.getRotationMatrix2D((cw / 2, ch / 2), angle, 1.0)
+    m[:, 2] += (cx - cw / 2, cy - ch / 2)
+    warped = cv2.warpAffine(card, m, (w, h), flags=cv2.INTER_LINEAR)
+    mask = cv2.warpAffine(np.full((ch, cw), 255, np.uint8), m, (w, h), flags=cv2.INTER_NEAREST)
+    frame[mask > 0] = warped[mask > 0]
+    corners = np.array([[0, 0, 1], [cw, 0, 1], [0, ch, 1], [cw, ch, 1]], np.float32) @ m.T
+    return (corners[:, 0].min(), corners[:, 1].min(),
+            corners[:, 0].max(), corners[:, 1].max())
+
+
+class Scene:
+    """
+    A clip of `frames` frames. Every object has
+        size      width in pixels at distance 1
+        dist      (start, end) distance — apparent size is size / distance
+        path      (start, end) centre as fractions of the frame
+        wobble    sideways sway amplitude (fraction of the frame width)
+    """
+
+    def __init__(self, width=640, height=480, frames=120, faces=2, cards=1,
+                 min_size=24, max_size=160, seed=0):
+        rng = np.random.default_rng(seed)
+        self.width, self.height, self.frames = width, height, frames
+        self.background = make_background(width, height, rng)
+        self.objects = []
+        for kind, count in (('face', faces), ('id', cards)):
+            for _ in range(count):
+                d0, d1 = rng.uniform(1.0, 3.0, 2)
+                obj = {
+                    'kind': kind,
+                    'size': rng.uniform(min_size, max_size) * min(d0, d1),
+                    'dist': (d0, d1),
+                    'path': (rng.uniform(0.15, 0.85, 2), rng.uniform(0.15, 0.85, 2)),
+                    'wobble': rng.uniform(0.0, 0.04),
+                    'period': rng.uniform(20, 60),
+                }
+                if kind == 'face':
+                    obj['skin'] = SKIN_TONES[int(rng.integers(len(SKIN_TONES)))]
+                    obj['hair'] = tuple(int(c) for c in rng.integers(10, 90, 3))
+                else:
+                    obj['angle'] = rng.uniform(-15, 15)
+                    obj['seed'] = int(rng.integers(1 << 31))
+                self.objects.append(obj)
+        self.objects.sort(key=lambda o: -max(o['dist']))   # far objects drawn first
+        self._noise = np.random.default_rng(seed + 1)
+
+    def render(self, t):
+        """(frame, {'face': (N, 4), 'id': (M, 4)} float boxes) for frame t"""
+        frame = self.background.copy()
+        w, h = self.width, self.height
+        u = t / max(1, self.frames - 1)
+        truth = {'face': [], 'id': []}
+        for obj in self.objects:
+            dist = obj['dist'][0] + (obj['dist'][1] - obj['dist'][0]) * u
+            size = obj['size'] / dist
+            (x0, y0), (x1, y1) = obj['path']
+            sway = obj['wobble'] * math.sin(2 * math.pi * t / obj['period'])
+            cx = (x0 + (x1 - x0) * u + sway) * w
+            cy = (y0 + (y1 - y0) * u) * h
+            if obj['kind'] == 'face':
+                box = draw_face(frame, cx, cy, size, obj['skin'], obj['hair'])
+            else:
+                card = make_card(max(8, round(size)), np.random.default_rng(obj['seed']))
+                box = paste_card(frame, card, cx, cy, obj['angle'])
+            x1b, y1b = max(0.0, box[0]), max(0.0, box[1])
+            x2b, y2b = min(float(w), box[2]), min(float(h), box[3])
+            if x2b - x1b >= 2 and y2b - y1b >= 2:
+                truth[obj['kind']].append((x1b, y1b, x2b, y2b))
+        noise = self._noise.normal(0, 4, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        return frame, {k: np.array(v, np.float32).reshape(-1, 4) for k, v in truth.items()}
+
+    def __iter__(self):
+        for t in range(self.frames):
+            yield self.render(t)
+
+
+def write_dataset(scenes, out_dir, quality=90):
+    """Frames and YOLO labels of every scene into out_dir/images and out_dir/labels"""
+    img_dir = os.path.join(out_dir, 'images')
+    lbl_dir = os.path.join(out_dir, 'labels')
+    os.makedirs(img_dir, exist_ok=True)
+    os.makedirs(lbl_dir, exist_ok=True)
+    n = 0
+    for s, scene in enumerate(scenes):
+        for t, (frame, truth) in enumerate(scene):
+            stem = f"{s:03d}_{t:05d}"
+            cv2.imwrite(os.path.join(img_dir, stem + '.jpg'), frame,
+                        [cv2.IMWRITE_JPEG_QUALITY, quality])
+            lines = []
+            for kind, boxes in truth.items():
+                for x1, y1, x2, y2 in boxes:
+                    lines.append(f"{CLASS_IDS[kind]} {(x1 + x2) / 2 / scene.width:.6f} "
+                                 f"{(y1 + y2) / 2 / scene.height:.6f} "
+                                 f"{(x2 - x1) / scene.width:.6f} {(y2 - y1) / scene.height:.6f}")
+            with open(os.path.join(lbl_dir, stem + '.txt'), 'w') as f:
+                f.write('\n'.join(lines))
+            n += 1
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic RTIOC scenes with labels")
+    parser.add_argument('--out', default='data/synth')
+    parser.add_argument('--scenes', type=int, default=1)
+    parser.add_argument('--frames', type=int, default=120, help="frames per scene")
+    parser.add_argument('--size', default='640x480', help="frame size WxH")
+    parser.add_argument('--faces', type=int, default=2, help="faces per scene")
+    parser.add_argument('--cards', type=int, default=1, help="ID cards per scene")
+    parser.add_argument('--min-size', type=float, default=24,
+                        help="smallest object width at its closest (px)")
+    parser.add_argument('--max-size', type=float, default=160,
+                        help="largest object width at its closest (px)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    scenes = [Scene(w, h, args.frames, args.faces, args.cards,
+                    args.min_size, args.max_size, seed=args.seed + i)
+              for i in range(args.scenes)]
+    n = write_dataset(scenes, args.out)
+    print(f"✅ {n} frames with labels written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from boxes import iou_matrix, nms, weighted_box_fusion   # noqa: E402
+
+
+def test_iou_matrix():
+    a = [[0, 0, 10, 10]]
+    b = [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30], [0, 0, 0, 0]]
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0, 0.0]], rtol=1e-6)
+
+
+def test_nms_keeps_best_of_overlapping():
+    boxes = [[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]]
+    scores = [0.6, 0.9, 0.7]
+    assert nms(boxes, scores, iou_thr=0.5).tolist() == [1, 2]
+
+
+def test_nms_keeps_boxes_below_threshold():
+    boxes = [[0, 0, 10, 10], [5, 0, 15, 10]]   # IoU 1/3
+    assert sorted(nms(boxes, [0.5, 0.6], iou_thr=0.5).tolist()) == [0, 1]
+
+
+def test_nms_empty():
+    assert nms(np.zeros((0, 4)), np.zeros(0)).tolist() == []
+
+
+def test_wbf_averages_agreeing_boxes():
+    boxes, scores = weighted_box_fusion([[[0, 0, 10, 10]], [[1, 1, 11, 11]]],
+                                        [[0.8], [0.8]])
+    np.testing.assert_allclose(boxes, [[0.5, 0.5, 10.5, 10.5]], rtol=1e-6)
+    np.testing.assert_allclose(scores, [0.8], rtol=1e-6)
+
+
+def test_wbf_weights_by_score():
+    boxes, _ = weighted_box_fusion([[[0, 0, 10, 10]], [[2, 0, 12, 10]]], [[0.9], [0.3]])
+    np.testing.assert_allclose(boxes, [[0.5, 0, 10.5, 10]], rtol=1e-6)
+
+
+def test_wbf_single_model_box_scores_lower():
+    boxes, scores = weighted_box_fusion([[[0, 0, 10, 10], [50, 50, 60, 60]], [[0, 0, 10, 10]]],
+                                        [[0.8, 0.8], [0.8]])
+    assert len(boxes) == 2
+    np.testing.assert_allclose(scores, [0.8, 0.4], rtol=1e-6)
+    np.testing.assert_allclose(boxes[1], [50, 50, 60, 60])
+
+
+def test_wbf_model_weights():
+    _, scores = weighted_box_fusion([[[0, 0, 10, 10]], np.zeros((0, 4))],
+                                    [[0.9], np.zeros(0)], weights=[2.0, 1.0])
+    np.testing.assert_allclose(scores, [0.6], rtol=1e-6)
+
+
+def test_wbf_empty():
+    boxes, scores = weighted_box_fusion([np.zeros((0, 4))], [np.zeros(0)])
+    assert boxes.shape == (0, 4) and scores.shape == (0,)
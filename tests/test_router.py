@@ -0,0 +1,51 @@
+from router import HashRing
+
+NODES = ['http://a:5000', 'http://b:5000', 'http://c:5000']
+KEYS = [f"session-{i}" for i in range(2000)]
+
+
+def owners(ring):
+    return {key: ring.nodes_for(key)[0] for key in KEYS}
+
+
+def test_empty_ring():
+    assert HashRing().nodes_for('x') == []
+
+
+def test_nodes_for_lists_every_node_once():
+    ring = HashRing(NODES)
+    for key in KEYS[:50]:
+        found = ring.nodes_for(key)
+        assert sorted(found) == sorted(NODES)
+
+
+def test_deterministic():
+    assert owners(HashRing(NODES)) == owners(HashRing(reversed(NODES)))
+
+
+def test_spread():
+    counts = {}
+    for node in owners(HashRing(NODES)).values():
+        counts[node] = counts.get(node, 0) + 1
+    assert min(counts.values()) > len(KEYS) / len(NODES) / 2
+
+
+def test_removing_a_node_only_moves_its_sessions():
+    ring = HashRing(NODES)
+    before = owners(ring)
+    ring.remove('http://b:5000')
+    after = owners(ring)
+    for key in KEYS:
+        if before[key] != 'http://b:5000':
+            assert after[key] == before[key]
+        else:
+            # to the next node on the ring, as nodes_for promised
+            assert after[key] == HashRing(NODES).nodes_for(key)[1]
+
+
+def test_node_comes_back():
+    ring = HashRing(NODES)
+    before = owners(ring)
+    ring.remove('http://c:5000')
+    ring.add('http://c:5000')
+    assert owners(ring) == before
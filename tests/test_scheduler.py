@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+import scheduler
+from scheduler import FairScheduler, Throttled
+
+CLASSES = {'live': (0, 1.0, None), 'bulk': (1, 1.0, None)}
+
+
+def test_fps_cap():
+    s = FairScheduler(classes={'live': (0, 1.0, 1)})
+    for _ in range(scheduler.FPS_BURST):
+        s.admit('a', 'live')
+    with pytest.raises(Throttled):
+        s.admit('a', 'live')
+    s.admit('b', 'live')   # budgets are per session
+    assert s.stats()['sessions']['a']['throttled'] == 1
+
+
+def test_unknown_class():
+    with pytest.raises(ValueError):
+        FairScheduler().admit('a', 'gold')
+
+
+def test_live_before_bulk():
+    s = FairScheduler(classes=CLASSES, starvation_ms=60000)
+    order = []
+    holder = s.submit('holder', 'live', lambda: None)
+    tickets = {}
+    for key, klass in [('bulk-1', 'bulk'), ('live-1', 'live')]:
+        tickets[key] = s.submit(key, klass, lambda key=key: order.append(key))
+    s.release(holder)
+    assert order == ['live-1']
+    s.release(tickets['live-1'])
+    assert order == ['live-1', 'bulk-1']
+
+
+def test_sessions_share_a_rank_fairly():
+    s = FairScheduler(classes=CLASSES, starvation_ms=60000)
+    order = []
+    holder = s.submit('holder', 'live', lambda: None)
+    tickets = []
+    # a floods the queue before b sends anything
+    for key in ['a', 'a', 'a', 'b']:
+        tickets.append(s.submit(key, 'live', lambda key=key: order.append(key)))
+    s.release(holder)
+    while len(order) < 4:
+        running = [t for t in tickets if t.granted and t.key == order[-1]]
+        s.release(running[-1])
+    assert order.index('b') <= 1
+
+
+def test_starved_frame_runs_next():
+    s = FairScheduler(classes=CLASSES, starvation_ms=0)
+    order = []
+    holder = s.submit('holder', 'live', lambda: None)
+    s.submit('bulk-1', 'bulk', lambda: order.append('bulk-1'))
+    s.submit('live-1', 'live', lambda: order.append('live-1'))
+    s.release(holder)
+    assert order == ['bulk-1']
+    assert s.stats()['starved'] >= 1
+
+
+def test_cancel_waiting_ticket():
+    s = FairScheduler(classes=CLASSES)
+    holder = s.submit('holder', 'live', lambda: None)
+    ticket = s.submit('a', 'live', lambda: pytest.fail("cancelled ticket was granted"))
+    s.cancel(ticket)
+    s.release(holder)
+    assert s.stats()['busy'] == 0
+
+
+def test_slot_blocks_until_free():
+    s = FairScheduler(classes=CLASSES)
+    entered = threading.Event()
+
+    def second():
+        with s.slot('b', 'live'):
+            entered.set()
+
+    with s.slot('a', 'live'):
+        t = threading.Thread(target=second)
+        t.start()
+        assert not entered.wait(0.1)
+    assert entered.wait(1.0)
+    t.join(1.0)
+    assert s.stats()['busy'] == 0
+
+
+def test_session_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(scheduler, 'MAX_SESSIONS', 16)
+    s = FairScheduler(classes=CLASSES)
+    queued = s.submit('queued', 'live', lambda: None)
+    for i in range(100):
+        s.admit(f"anon-{i}", 'live')
+    assert len(s.sessions) <= 16
+    assert 'queued' in s.sessions   # a session with a frame in the models stays
+    assert 'anon-99' in s.sessions
+    s.release(queued)
@@ -0,0 +1,127 @@
+"""
+update_id_tracker against the per-box loops it replaced: the same raw
+boxes must leave the tracker in exactly the same state.
+"""
+
+import os
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('flask')
+pytest.importorskip('torch')
+os.environ.setdefault('RTIOC_STUB_MODELS', '1')
+
+import app_final3 as rtioc   # noqa: E402
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def reference_update(raw_boxes, t):
+    """The tracker as it was written before the array version"""
+    IOU_THRESH = 0.3
+    a = rtioc.ID_SMOOTH_ALPHA
+
+    def smooth_box(old, new):
+        return tuple(int(old[k] * (1 - a) + new[k] * a) for k in range(4))
+
+    matched_candidates = set()
+    matched_raw = set()
+    for i, cand in enumerate(t['candidates']):
+        for j, raw in enumerate(raw_boxes):
+            if j in matched_raw:
+                continue
+            if box_iou(cand, raw) > IOU_THRESH:
+                t['candidates'][i] = smooth_box(cand, raw)
+                t['hit_counts'][i] += 1
+                matched_candidates.add(i)
+                matched_raw.add(j)
+                break
+    for i in range(len(t['candidates'])):
+        if i not in matched_candidates:
+            t['hit_counts'][i] = 0
+    for j, raw in enumerate(raw_boxes):
+        if j not in matched_raw:
+            t['candidates'].append(raw)
+            t['hit_counts'].append(1)
+
+    new_candidates, new_hits = [], []
+    for box, hits in zip(t['candidates'], t['hit_counts']):
+        if hits >= rtioc.ID_CONFIRM_FRAMES:
+            if not any(box_iou(box, cb) > IOU_THRESH for cb in t['boxes']):
+                t['boxes'].append(box)
+                t['miss_counts'].append(0)
+                t['track_ids'].append(t['next_track'])
+                t['next_track'] += 1
+        elif hits > 0:
+            new_candidates.append(box)
+            new_hits.append(hits)
+    t['candidates'] = new_candidates
+    t['hit_counts'] = new_hits
+
+    matched_confirmed = set()
+    for raw in raw_boxes:
+        for i, conf in enumerate(t['boxes']):
+            if box_iou(raw, conf) > IOU_THRESH:
+                t['boxes'][i] = smooth_box(conf, raw)
+                t['miss_counts'][i] = 0
+                matched_confirmed.add(i)
+                break
+    for i in range(len(t['boxes'])):
+        if i not in matched_confirmed:
+            t['miss_counts'][i] += 1
+
+    surviving = [(b, m, k) for b, m, k in zip(t['boxes'], t['miss_counts'], t['track_ids'])
+                 if m <= rtioc.ID_FORGET_FRAMES]
+    t['boxes'] = [x[0] for x in surviving]
+    t['miss_counts'] = [x[1] for x in surviving]
+    t['track_ids'] = [x[2] for x in surviving]
+    return t['boxes']
+
+
+def scene(rng, frames):
+    """Cards that drift, flicker in and out and sometimes overlap"""
+    cards = [[rng.randrange(0, 300), rng.randrange(0, 200)] for _ in range(4)]
+    for _ in range(frames):
+        raw = []
+        for card in cards:
+            card[0] += rng.randrange(-6, 7)
+            card[1] += rng.randrange(-6, 7)
+            if rng.random() < 0.75:
+                x, y = card
+                raw.append((x, y, x + 60 + rng.randrange(-4, 5), y + 40 + rng.randrange(-4, 5)))
+        rng.shuffle(raw)
+        yield raw
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_reference(seed):
+    ours, ref = rtioc.new_id_tracker(), rtioc.new_id_tracker()
+    for raw in scene(random.Random(seed), 120):
+        confirmed = rtioc.update_id_tracker(raw, ours)
+        expected = reference_update(list(raw), ref)
+        assert [tuple(b) for b in confirmed] == expected
+        for key in ('candidates', 'hit_counts', 'miss_counts', 'track_ids', 'next_track'):
+            got = ours[key]
+            if key == 'candidates':
+                got = [tuple(b) for b in got]
+            assert got == ref[key], key
+
+
+def test_confirms_after_confirm_frames_and_forgets():
+    t = rtioc.new_id_tracker()
+    card = (10, 10, 70, 50)
+    for _ in range(rtioc.ID_CONFIRM_FRAMES - 1):
+        assert rtioc.update_id_tracker([card], t) == []
+    assert len(rtioc.update_id_tracker([card], t)) == 1
+    for _ in range(rtioc.ID_FORGET_FRAMES):
+        assert len(rtioc.update_id_tracker([], t)) == 1
+    assert rtioc.update_id_tracker([], t) == []
@@ -0,0 +1,70 @@
+import socket
+
+import pytest
+
+import wire
+
+
+@pytest.fixture
+def pipe():
+    a, b = socket.socketpair()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_request_roundtrip(pipe):
+    a, b = pipe
+    head, body = wire.pack_request(7, b'\xff\xd8jpeg', session='cam-1', fmt=wire.FORMAT_BGR,
+                                   flags=wire.FLAG_BULK, width=4, height=2)
+    a.sendall(head + body)
+    assert wire.read_request(b) == (7, 'cam-1', wire.FORMAT_BGR, wire.FLAG_BULK, 4, 2,
+                                    b'\xff\xd8jpeg')
+
+
+def test_request_without_session(pipe):
+    a, b = pipe
+    head, body = wire.pack_request(1, b'x')
+    a.sendall(head + body)
+    assert wire.read_request(b)[1] == ''
+
+
+def test_response_roundtrip(pipe):
+    a, b = pipe
+    boxes = [(0, 0, 1, 2, 30, 40), (2, 1, -5, 0, 10, 10)]
+    head, body = wire.pack_response(9, wire.STATUS_OK, wire.FORMAT_JPEG, boxes, b'img', 64, 48)
+    a.sendall(head + body)
+    assert wire.read_response(b) == (9, wire.STATUS_OK, wire.FORMAT_JPEG, boxes, 64, 48, b'img')
+
+
+def test_bad_magic(pipe):
+    a, b = pipe
+    head, body = wire.pack_request(1, b'x')
+    a.sendall(b'XX' + head[2:] + body)
+    with pytest.raises(wire.ProtocolError):
+        wire.read_request(b)
+
+
+def test_session_not_utf8(pipe):
+    a, b = pipe
+    a.sendall(wire.REQUEST.pack(wire.MAGIC, wire.VERSION, wire.FORMAT_JPEG, 1, 0, 2, 0, 0, 0)
+              + b'\xff\xfe')
+    with pytest.raises(wire.ProtocolError):
+        wire.read_request(b)
+
+
+def test_unknown_box_kind(pipe):
+    a, b = pipe
+    head, body = wire.pack_response(1, wire.STATUS_OK, boxes=[(len(wire.KINDS), 1, 0, 0, 1, 1)])
+    a.sendall(head + body)
+    with pytest.raises(wire.ProtocolError):
+        wire.read_response(b)
+
+
+def test_connection_closed_mid_message(pipe):
+    a, b = pipe
+    head, body = wire.pack_request(1, b'payload')
+    a.sendall(head + body[:3])
+    a.shutdown(socket.SHUT_WR)
+    with pytest.raises(ConnectionError):
+        wire.read_request(b)
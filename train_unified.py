@@ -0,0 +1,131 @@
+"""
+Build a single face + ID card detector for RTIOC
+
+The current separate models act as teachers: they pseudo-label a folder
+of local images (ID card labels you already have are used as-is), and a
+2-class student is fine-tuned on the result, starting from the face
+model's weights. The result is saved as models/unified.pt, which
+app_final3.py then runs instead of the separate models.
+
+Usage:
+    python train_unified.py --images data/frames --epochs 50
+    python train_unified.py --images data/frames --id-labels data/id_labels
+Compare against the separate models afterwards with:
+    python benchmark.py unified --images data/val_frames [--labels data/val_labels]
+"""
+
+import argparse
+import os
+import random
+import shutil
+
+import cv2
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp'}
+CLASS_NAMES = {'face': 'face', 'id': 'id_card'}
+
+
+def list_images(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                  if os.path.splitext(f)[1].lower() in IMAGE_EXTS)
+
+
+def read_yolo_labels(path, w, h):
+    """YOLO txt labels -> list of (cls, x1, y1, x2, y2) in pixels"""
+    boxes = []
+    if not os.path.exists(path):
+        return boxes
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cls, cx, cy, bw, bh = int(parts[0]), *map(float, parts[1:5])
+            boxes.append((cls, int((cx - bw / 2) * w), int((cy - bh / 2) * h),
+                          int((cx + bw / 2) * w), int((cy + bh / 2) * h)))
+    return boxes
+
+
+def yolo_line(cls, box, w, h):
+    x1, y1, x2, y2 = (int(v) for v in box)
+    return (f"{cls} {(x1 + x2) / 2 / w:.6f} {(y1 + y2) / 2 / h:.6f} "
+            f"{(x2 - x1) / w:.6f} {(y2 - y1) / h:.6f}")
+
+
+def build_dataset(rtioc, images, id_labels, out_dir, val_fraction, seed):
+    """Pseudo-label images with the teacher models into a YOLO dataset"""
+    face_cls, id_cls = rtioc.UNIFIED_CLASSES['face'], rtioc.UNIFIED_CLASSES['id']
+    random.Random(seed).shuffle(images)
+    n_val = max(1, int(len(images) * val_fraction))
+    counts = {'face': 0, 'id': 0}
+
+    for i, path in enumerate(images):
+        split = 'val' if i < n_val else 'train'
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            continue
+        h, w = frame.shape[:2]
+        stem = os.path.splitext(os.path.basename(path))[0]
+
+        lines = [yolo_line(face_cls, b, w, h) for b in rtioc.detect_faces(frame)]
+        counts['face'] += len(lines)
+        label_path = os.path.join(id_labels, stem + '.txt') if id_labels else None
+        if label_path and os.path.exists(label_path):
+            # Existing ID ground truth beats the teachers
+            id_boxes = [b[1:] for b in read_yolo_labels(label_path, w, h)]
+        else:
+            id_boxes = rtioc.detect_ids(frame, rtioc.new_session())
+        lines += [yolo_line(id_cls, b, w, h) for b in id_boxes]
+        counts['id'] += len(id_boxes)
+
+        img_dir = os.path.join(out_dir, 'images', split)
+        lbl_dir = os.path.join(out_dir, 'labels', split)
+        os.makedirs(img_dir, exist_ok=True)
+        os.makedirs(lbl_dir, exist_ok=True)
+        shutil.copy(path, img_dir)
+        with open(os.path.join(lbl_dir, stem + '.txt'), 'w') as f:
+            f.write('\n'.join(lines))
+
+    data_yaml = os.path.join(out_dir, 'data.yaml')
+    with open(data_yaml, 'w') as f:
+        f.write(f"path: {os.path.abspath(out_dir)}\n"
+                "train: images/train\nval: images/val\nnames:\n")
+        for key, idx in sorted(rtioc.UNIFIED_CLASSES.items(), key=lambda kv: kv[1]):
+            f.write(f"  {idx}: {CLASS_NAMES[key]}\n")
+    print(f"✅ Dataset: {len(images)} images, {counts['face']} faces, "
+          f"{counts['id']} ID cards -> {data_yaml}")
+    return data_yaml
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil the face and ID models into one")
+    parser.add_argument('--images', required=True, help="folder of local training frames")
+    parser.add_argument('--id-labels', help="YOLO labels for ID cards (every box counts), if you have them")
+    parser.add_argument('--out', default='datasets/unified')
+    parser.add_argument('--init', help="student starting weights (default: the face model)")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--imgsz', type=int, default=320)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--val-fraction', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app_final3 as rtioc
+    from ultralytics import YOLO
+
+    images = list_images(args.images)
+    if not images:
+        raise SystemExit(f"❌ ERROR: no images found in {args.images}")
+    data_yaml = build_dataset(rtioc, images, args.id_labels, args.out,
+                              args.val_fraction, args.seed)
+
+    student = YOLO(args.init or rtioc.MODEL_PATH_FACE)
+    student.train(data=data_yaml, epochs=args.epochs, imgsz=args.imgsz,
+                  batch=args.batch, device=rtioc.DEVICE,
+                  project=os.path.join(args.out, 'runs'), name='unified')
+    shutil.copy(student.trainer.best, rtioc.MODEL_PATH_UNIFIED)
+    print(f"✅ Unified model saved to {rtioc.MODEL_PATH_UNIFIED}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Machine-specific runtime settings for RTIOC
+
+autotune.py measures thread counts, PROCESS_SIZE and the worker count on
+this machine and writes them to tuning.json; app_final3 loads the file
+at startup (before any model runs) and prefork.py takes its worker count
+from it. RTIOC_TUNING points at another file. Without a file nothing is
+changed and torch / OpenCV keep their own defaults.
+"""
+
+import json
+import os
+import time
+
+TUNING_PATH = 'tuning.json'
+SETTINGS = {
+    'torch_threads':   'torch.set_num_threads — threads per forward pass',
+    'interop_threads': 'torch.set_num_interop_threads',
+    'cv2_threads':     'cv2.setNumThreads — resize, blur and colour conversion',
+    'process_size':    'PROCESS_SIZE — inference long side',
+    'workers':         'prefork.py worker processes',
+}
+
+
+def load_tuning(path=TUNING_PATH):
+    """Settings dict from a tuning file ({} if there is none)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        settings = {k: int(v) for k, v in data['settings'].items() if k in SETTINGS}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"⚠️  Ignoring {path}: {e}")
+        return {}
+    cores = data.get('machine', {}).get('cores')
+    if cores and cores != os.cpu_count():
+        print(f"⚠️  {path} was tuned on a {cores}-core machine, this one has "
+              f"{os.cpu_count()} — re-run autotune.py")
+    return settings
+
+
+def apply_threads(settings):
+    """Apply the thread counts; must run before the first torch / OpenCV work"""
+    if 'torch_threads' in settings or 'interop_threads' in settings:
+        import torch
+        if 'torch_threads' in settings:
+            torch.set_num_threads(settings['torch_threads'])
+        if 'interop_threads' in settings:
+            try:
+                torch.set_num_interop_threads(settings['interop_threads'])
+            except RuntimeError:
+                # only allowed once, before any inter-op parallel work started
+                print("⚠️  torch inter-op threads were already set — tuning value not applied")
+    if 'cv2_threads' in settings:
+        import cv2
+        cv2.setNumThreads(settings['cv2_threads'])
+
+
+def save_tuning(path, settings, objective=None, measured=None):
+    data = {
+        'settings': settings,
+        'objective': objective,
+        'measured': measured,
+        'machine': {'cores': os.cpu_count(), 'platform': os.uname().sysname
+                    if hasattr(os, 'uname') else os.name},
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
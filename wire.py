@@ -0,0 +1,102 @@
+"""
+RTIOC binary protocol (service-to-service redaction)
+
+Length-prefixed messages over one persistent TCP connection. A client
+may send many requests before reading any reply (pipelining); replies
+come back in request order and carry the request id. All integers are
+little-endian.
+
+Request
+    header   magic 'RB', version, format, request id, flags,
+             session id length, width, height, payload length
+    session  utf-8 session id (frames of one session share a tracker)
+    payload  JPEG bytes (FORMAT_JPEG) or width*height*3 BGR bytes (FORMAT_BGR)
+
+Response
+    header   magic 'RB', status, format, request id, box count,
+             width, height, payload length
+    boxes    box count x (kind, blurred, x1, y1, x2, y2)
+    payload  redacted image in the request's format (empty with
+             FLAG_BOXES_ONLY), or a utf-8 error message when status != 0
+"""
+
+import struct
+
+MAGIC = b'RB'
+VERSION = 1
+DEFAULT_PORT = 5050
+
+FORMAT_JPEG = 0
+FORMAT_BGR = 1
+
+FLAG_BOXES_ONLY = 1   # don't send the redacted image back
+FLAG_BULK       = 2   # schedule in the 'bulk' priority class (behind live sessions)
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+KINDS = ('speaker', 'face', 'id')
+
+REQUEST = struct.Struct('<2sBBIBHHHI')
+RESPONSE = struct.Struct('<2sBBIHHHI')
+BOX = struct.Struct('<BBiiii')
+
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def read_exact(sock, n):
+    """Exactly n bytes from sock; ConnectionError if it closes first"""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            raise ConnectionError("connection closed")
+        got += k
+    return bytes(buf)
+
+
+def pack_request(request_id, payload, session='', fmt=FORMAT_JPEG, flags=0, width=0, height=0):
+    sid = session.encode('utf-8')
+    header = REQUEST.pack(MAGIC, VERSION, fmt, request_id, flags, len(sid),
+                          width, height, len(payload))
+    return header + sid, payload
+
+
+def read_request(sock):
+    """(request id, session, format, flags, width, height, payload)"""
+    magic, version, fmt, request_id, flags, sid_len, width, height, size = \
+        REQUEST.unpack(read_exact(sock, REQUEST.size))
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError("not an RTIOC v1 request")
+    if size > MAX_PAYLOAD:
+        raise ProtocolError(f"payload of {size} bytes is too large")
+    try:
+        session = read_exact(sock, sid_len).decode('utf-8') if sid_len else ''
+    except UnicodeDecodeError:
+        raise ProtocolError("session id is not utf-8") from None
+    return request_id, session, fmt, flags, width, height, read_exact(sock, size)
+
+
+def pack_response(request_id, status, fmt=FORMAT_JPEG, boxes=(), payload=b'', width=0, height=0):
+    """boxes: (kind, blurred, x1, y1, x2, y2) tuples"""
+    header = RESPONSE.pack(MAGIC, status, fmt, request_id, len(boxes), width, height, len(payload))
+    return header + b''.join(BOX.pack(*b) for b in boxes), payload
+
+
+def read_response(sock):
+    """(request id, status, format, boxes, width, height, payload)"""
+    magic, status, fmt, request_id, n_boxes, width, height, size = \
+        RESPONSE.unpack(read_exact(sock, RESPONSE.size))
+    if magic != MAGIC:
+        raise ProtocolError("not an RTIOC response")
+    raw = read_exact(sock, n_boxes * BOX.size)
+    boxes = [BOX.unpack_from(raw, i * BOX.size) for i in range(n_boxes)]
+    if any(b[0] >= len(KINDS) for b in boxes):
+        raise ProtocolError("unknown box kind")
+    return request_id, status, fmt, boxes, width, height, read_exact(sock, size)